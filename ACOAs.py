@@ -6,30 +6,37 @@
 #-------------------------------------------------------------------------------------------------------%
 
 import random
-import copy
+import numpy as np
+import Engine
+import Pheromone
+import Parallel
+import LocalSearch
+import Tours
+import Monitor
+import Checkpoint
+import Warm
+import Construction
+import Kernels
 
 def RandTravel(costGraph):
     """ Takes a graph and returns
         a random hamiltonian circle route"""
     
-    allNodes = [Nodes for Nodes in range(len(costGraph))]
-    startNode = random.choice(allNodes)
-    TAKEN = [startNode]
-    availableNodes = allNodes[:]
-    availableNodes.remove(startNode)
-
-    # make sequencial choices 
-    while len(availableNodes) > 0:
-        nextNode = random.choice(availableNodes)
-        TAKEN.append(nextNode)
-        startNode = TAKEN[-1]
-        availableNodes.remove(nextNode)
+    # a shuffle gives the same uniform random tour without the O(n) list.remove per step
+    TAKEN = list(range(len(costGraph)))
+    random.shuffle(TAKEN)
     TAKEN.append(TAKEN[0])
     return TAKEN
 
 def TravelCost(CostGraph, route):
     """ takes a costgrpah and a route 
     and returns the cost of the route"""
+    if isinstance(route, Tours.Tour) and route.cost is not None:
+        return route.cost
+    if hasattr(CostGraph, "Nearest") or isinstance(CostGraph, np.ndarray):
+        # array or on demand costs (RouteMatrix.Implicit): one vectorized lookup of all arcs
+        route = np.asarray(route)
+        return float(CostGraph[route[:-1], route[1:]].sum())
     return sum([CostGraph[j][route[i+1]] for i,j in enumerate(route) if i < len(route)-1])
 
 def NextNode(Connections, RouletteProb):
@@ -45,38 +52,8 @@ def NextNode(Connections, RouletteProb):
 def Travel(costGraph, pheromoneGraph, alpha = 1, beta = 3, dropout = True):
     """ Takes a cost graph, pheromone graph and returns
         a hamiltonian circle route """
-    
-    allNodes = [Nodes for Nodes in range(len(costGraph))]
-    startNode = random.choice(allNodes)
-    TAKEN = [startNode]
-    availableNodes = allNodes[:]
-    availableNodes.remove(startNode)
-
-    # make sequencial choices 
-    while len(availableNodes) > 0:
-        
-        #--------------- DROP OUT -------------------------------------------------------------------
-        usedNodes = availableNodes[:]
-        if dropout == True and len(usedNodes) > 1:
-            [usedNodes.remove(random.choice(usedNodes)) for i in range(len(usedNodes)) 
-             if (random.random() < 0.01 and len(usedNodes)>1)]
-        #--------------------------------------------------------------------------------------------
-        
-        pheromones = [pheromoneGraph[startNode][usedNode] for usedNode in usedNodes]
-        costs = [1/costGraph[startNode][usedNode] for usedNode in usedNodes]
-
-        numerators = [(i**alpha)*(j**beta) for i,j in zip(pheromones,costs)]
-        probabilities = [i/sum(numerators) for i in numerators]
-
-        RouletteProb = [ sum(probabilities[:i+1]) for i in range(len(probabilities)) ]
-        nextNode = NextNode(usedNodes, RouletteProb)
-        
-        TAKEN.append(nextNode)
-        startNode = TAKEN[-1]
-        availableNodes.remove(nextNode)
-       
-    TAKEN.append(TAKEN[0])
-    return TAKEN
+    choice = Engine.ChoiceMatrix(pheromoneGraph, Engine.Heuristic(costGraph), alpha, beta)
+    return Engine.ArrayTravel(choice, dropout = dropout).tolist()
 
 def Updatepheromone(route, costGraph, pheromoneGraph, rho = 0.5):
     """route : route taken
@@ -85,53 +62,244 @@ def Updatepheromone(route, costGraph, pheromoneGraph, rho = 0.5):
     C = TravelCost(costGraph, route)
     tau = 1/C
     #tau = 1
-    for i in range(len(route)-1):
-        pheromoneGraph[route[i]][route[i+1]] = (1-rho)*(pheromoneGraph[route[i]][route[i+1]]) + tau
-        pheromoneGraph[route[i+1]][route[i]] = (1-rho)*(pheromoneGraph[route[i+1]][route[i]]) + tau
+    pheromoneGraph = Pheromone.AsArray(pheromoneGraph)
+    i, j = Pheromone.Arcs(route)
+    pheromoneGraph[i, j] = (1-rho)*(pheromoneGraph[i, j]) + tau
+    pheromoneGraph[j, i] = (1-rho)*(pheromoneGraph[j, i]) + tau
 
     return pheromoneGraph
 
+#------------------------------------SHARED RUN: SETUP, BOOKKEEPING and RESULT--------------------------
+
+class Run:
+    """ what the five solvers share: stopping rules, the start tour (random,
+        construction heuristic or warm start), rng, costs, candidate lists,
+        pheromone layout, worker pool, local search, timer, the ants with
+        IBEST and BSF, migration, checkpoints and the result. The arguments
+        are the solver's own; the solvers add their pheromone rules """
+
+    def __init__(self, costGraph, Population, iterations, show, seed, batch, candidates, dtype, workers,
+                 exchange, local_search, on_iteration, timings, time_limit, target, patience,
+                 checkpoint, checkpoint_every, checkpoint_seconds, resume, warm, construction, layout, coords,
+                 metrics, should_stop):
+        self.budget = Monitor.Budget(time_limit, target, patience)
+        self.iterations = self.budget.Iterations(iterations)
+        # a construction heuristic tour ("nn", "greedy", "sfc", "christofides") scales the pheromones far better.
+        # "sfc" needs the city coordinates: coords, or those of a RouteMatrix.Implicit cost
+        RT = RandTravel(costGraph) if construction is None else Construction.Tour(costGraph, construction, coords)
+        #-----------------WARM START: the best known tour replaces the random one--------------------
+        self.warm = Warm.Start(warm, costGraph) if warm is not None else None
+        self.RT, self.RandCost = Warm.Best(self.warm, RT, TravelCost(costGraph, RT))
+        if seed is None:
+            # drawn from the global random module, so random.seed() reproduces the run
+            seed = random.getrandbits(64)
+        self.rng = np.random.default_rng(seed)
+        self.cost = Engine.Costs(costGraph)
+        self.cand = Engine.Candidates(self.cost, candidates)
+        # "packed" store for symmetric costs, "directed" updates for asymmetric ones (Pheromone.Layout)
+        self.layout = Pheromone.Layout(self.cost, layout, self.cand)
+        self.symmetric = self.layout != "directed"
+        self.dtype = dtype
+        self.eta = Engine.Heuristic(self.cost, dtype, self.cand)
+        self.colony = Parallel.Colony(self.cost, workers, seed) if workers else None
+        self.local_search = local_search
+        self.near = Engine.Candidates(self.cost, 10 if self.cand is None else self.cand) if local_search else None
+        self.search = LocalSearch.Symmetrized(self.cost, self.symmetric) if local_search else None
+        self.timer = Monitor.Timer(on_iteration is not None or timings)
+        self.Timings = []
+        self.Population, self.show, self.batch = Population, show, batch
+        self.exchange, self.on_iteration, self.timings = exchange, on_iteration, timings
+        # the O(n^2) stagnation metrics (entropy, branching) go into the records only when asked for
+        self.metrics = metrics
+        # a plain stop test, e.g. a cancel flag: unlike on_iteration it needs no timer or record
+        self.should_stop = should_stop
+        self.resume = resume
+        self.saver = Checkpoint.Checkpointer(checkpoint, checkpoint_every, checkpoint_seconds) if checkpoint else None
+        self.iteration, self.stop = 0, "iterations"
+
+    def Start(self, level, reinforce = None):
+        """ returns the pheromone store, set to level, with the warm start applied
+            (the known tours go through reinforce(PRM, tour), by default a plain
+            deposit, as incoming migrants do), and sets up the ants, IBEST and
+            BSF. On resume the checkpoint replaces all of it; its solver
+            variables are left in self.variables """
+        n = len(self.cost)
+        self.PRM = PRM = Pheromone.Init(n, level, self.dtype, self.cand, self.layout)
+        if self.warm is not None:
+            if self.warm["PRM"] is not None:
+                Warm.Remap(PRM, self.warm["PRM"], self.warm["mapping"], self.cand)
+            else:
+                for tour in self.warm["tours"]:
+                    if reinforce is None:
+                        Pheromone.Deposit(PRM, tour["Route"], 1/tour["Cost"], self.symmetric, self.cand)
+                    else:
+                        reinforce(PRM, tour)
+        #-------------------Initialize Ants and Best So Far (BSF) and iteration best IBEST--------------
+        self.Ants = {"Ant" + str(i+1): {"Route": Tours.Tour(self.RT, self.RandCost), "Cost": self.RandCost}
+                     for i in range(self.Population)}
+        self.BSF = self.IBEST = self.Ants["Ant1"]
+        self.variables = {}
+        if self.resume is not None:
+            # continue a checkpointed run: iterations counts the iterations still to run
+            self.iteration, self.BSF, self.IBEST, self.variables = Checkpoint.Restore(self.resume, PRM, self.rng,
+                                                                                       self.budget, self.colony)
+        return PRM
+
+    def Next(self):
+        """ starts the next iteration, False once the iterations are used up """
+        if self.iterations <= 0:
+            return False
+        self.iteration += 1
+        self.timer.Reset()
+        return True
+
+    def Travel(self, choice, dropout):
+        """ the routes and costs of the colony built from choice (AS, EAS, RBAS, MMAS) """
+        if self.colony is not None:
+            routes, costs = self.colony.Travel(choice, self.Population, dropout, cand = self.cand)
+            self.timer.Mark("construction")
+        else:
+            if self.batch:
+                routes = Engine.BatchTravel(choice, self.Population, self.rng, dropout, cand = self.cand,
+                                            cost = self.cost)
+            else:
+                routes = np.array([Engine.ArrayTravel(choice, self.rng, dropout, cand = self.cand, cost = self.cost)
+                                   for ant in range(self.Population)])
+            self.timer.Mark("construction")
+            costs = Engine.TourCosts(self.cost, routes)
+        self.timer.Mark("cost")
+        return routes, costs
+
+    def ACSTravel(self, choice, greedy, etaB, t0, eps, q0, alpha, dropout):
+        """ the routes and costs of the ACS colony, local updates applied to the pheromones """
+        if self.colony is not None:
+            routes, costs = self.colony.ACSTravel(choice, greedy, self.PRM, etaB, t0, self.Population, eps, q0, alpha,
+                                                  dropout, self.cand, self.batch, self.symmetric)
+            self.timer.Mark("construction")
+        else:
+            if self.batch:
+                routes = Engine.BatchACSTravel(choice, greedy, self.PRM, etaB, t0, self.Population, eps, q0, alpha,
+                                               self.rng, dropout, self.cand, self.cost, self.symmetric)
+            else:
+                routes = np.array([Engine.ArrayACSTravel(choice, greedy, self.PRM, etaB, t0, eps, q0, alpha,
+                                                         self.rng, dropout, cand = self.cand, cost = self.cost,
+                                                         symmetric = self.symmetric)
+                                   for ant in range(self.Population)])
+            self.timer.Mark("construction")
+            costs = Engine.TourCosts(self.cost, routes)
+        self.timer.Mark("cost")
+        return routes, costs
+
+    def Tours(self, routes, costs):
+        """ local search, then the ant records, IBEST and BSF of the iteration.
+            Returns the routes, their costs and whether BSF improved """
+        #--------------LOCAL SEARCH (2-opt / Or-opt)------------------
+        if self.local_search:
+            routes, costs = LocalSearch.Apply(routes, costs, self.cost, self.near, self.local_search,
+                                              self.BSF["Cost"], symmetric = self.symmetric, search = self.search)
+            self.timer.Mark("local_search")
+        for k, ant in enumerate(self.Ants):
+            # fresh records every iteration, so IBEST and BSF can share them instead of deep copies
+            self.Ants[ant] = {"Route": Tours.Tour(routes[k], costs[k]), "Cost": float(costs[k])}
+            #--------------GET ITERATION BEST------------------------------
+            if k == 0 or self.Ants[ant]["Cost"] < self.IBEST["Cost"]:
+                self.IBEST = self.Ants[ant]
+        #-------------GET BEST SO FAR TOUR-------------------------------
+        improved = self.IBEST["Cost"] < self.BSF["Cost"]
+        if improved:
+            self.BSF = self.IBEST
+        return routes, costs, improved
+
+    def Migrate(self):
+        """ shares BSF through the exchange hook and returns the incoming tour
+            (None when there is none), already adopted as BSF when better.
+            The solver reinforces it with its own rule """
+        incoming = self.exchange(self.iteration, self.BSF) if self.exchange is not None else None
+        if incoming is not None and incoming["Cost"] < self.BSF["Cost"]:
+            self.BSF = incoming
+        return incoming
+
+    def End(self, **variables):
+        """ closes an iteration: prints, records, applies the stopping rules and
+            checkpoints with the solver's variables. True when the run stops """
+        if self.show == True:
+            print("Iteration Best is ", self.IBEST["Cost"] , " and Best so far is ", self.BSF["Cost"])
+        #-------------INSTRUMENTATION: RECORD, and STOP if on_iteration or should_stop says so--
+        if self.timer.enabled:
+            record = Monitor.Record(self.iteration, self.IBEST, self.BSF, self.timer,
+                                    self.PRM if self.metrics else None)
+            if self.timings:
+                self.Timings.append(record)
+            if self.on_iteration is not None and self.on_iteration(record):
+                self.stop = "callback"
+                return True
+        if self.should_stop is not None and self.should_stop():
+            self.stop = "callback"
+            return True
+        self.iterations -= 1
+        #-------------STOP on TIME BUDGET, TARGET COST or NO IMPROVEMENT--
+        reason = self.budget.Check(self.BSF["Cost"])
+        #-------------CHECKPOINT (the last one is written by Finish)------
+        if self.saver is not None and reason is None and self.iterations > 0 and self.saver.Due(self.iteration):
+            self.saver.Save(self.State(**variables))
+        if reason is not None:
+            self.stop = reason
+            return True
+        return False
+
+    def State(self, **variables):
+        return Checkpoint.State(self.iteration, self.PRM, self.BSF, self.IBEST, self.rng, self.budget, self.colony,
+                                **variables)
+
+    def Finish(self, **variables):
+        """ writes the last checkpoint, stops the workers and returns the solver result.
+            The result has the n x n pheromone matrix whatever the layout; the
+            packed store stays in the State, for resuming """
+        state = self.State(**variables)
+        if self.saver is not None:
+            self.saver.Save(state)
+        if self.colony is not None:
+            self.colony.Close()
+        return {"Ants": self.Ants, "PRM": Pheromone.Dense(self.PRM), "BSF": self.BSF["Cost"], "IBEST": self.IBEST["Cost"],
+                "Route": self.BSF["Route"], "Timings": self.Timings,
+                "Stop": self.stop, "Iterations": self.iteration, "State": state, "Backend": Kernels.Backend(),
+                "Layout": self.layout}
+
 #------------------------------------ANT SYSTEM--------------------------------------------------------
-def AS(costGraph, Population = 8, alpha = 1, beta = 3, rho = 0.5, iterations = 100, dropout = False, show = False):
+def AS(costGraph, Population = 8, alpha = 1, beta = 3, rho = 0.5, iterations = 100, dropout = False, show = False, seed = None, batch = False,
+        candidates = None, dtype = np.float64, workers = None,
+        exchange = None, local_search = None, on_iteration = None, timings = False,
+        time_limit = None, target = None, patience = None,
+        checkpoint = None, checkpoint_every = None, checkpoint_seconds = None, resume = None,
+        warm = None, construction = None, layout = None, coords = None, metrics = False,
+        should_stop = None):
     """ takes a costgraph, takeoff point, destination point and number of times to travel (iterations)
     and return a tour """
+    run = Run(costGraph, Population, iterations, show, seed, batch, candidates, dtype, workers,
+              exchange, local_search, on_iteration, timings, time_limit, target, patience,
+              checkpoint, checkpoint_every, checkpoint_seconds, resume, warm, construction, layout, coords,
+              metrics, should_stop)
     #-----------------INITIALIZE PHEROMONE----------------------------------------------------------
-    RT = RandTravel(costGraph)
-    RandCost = TravelCost(costGraph, RT)
-    PRM = [[Population/RandCost for i in range(len(costGraph))] for j in range(len(costGraph))]
-    
-    #-------------------Initialize Ants and Best So Far (BSF) and iteration best IBEST--------------
-    Ants = {"Ant" + str(i+1): {"Route": RT, "Cost": RandCost} for i in range(Population)}
-    BSF = {"BSF": copy.deepcopy(Ants["Ant1"])}
-    IBEST = {"IBEST": copy.deepcopy(Ants["Ant1"])}
-    #-----------------------------------------------------------------------------------------------
-    while iterations > 0:
+    PRM = run.Start(Population/run.RandCost)
+    symmetric, cand = run.symmetric, run.cand
+    while run.Next():
         #--------------TRAVEL-----------------------------------------
-        for ant in Ants:
-            Ants[ant]["Route"] = Travel(costGraph, PRM, alpha, beta, dropout)
-            Ants[ant]["Cost"] = TravelCost(costGraph, Ants[ant]["Route"])
-            
-        #--------------GET ITERATION BEST------------------------------
-            if Ants[ant] == Ants["Ant1"]:
-                IBEST = {"IBEST": copy.deepcopy(Ants[ant])}
-            elif Ants[ant]["Cost"] < IBEST["IBEST"]["Cost"]:
-                IBEST = {"IBEST": copy.deepcopy(Ants[ant])}
-                
-        #-------------GET BEST SO FAR TOUR and UPDATE tmax--------------
-        if IBEST["IBEST"]["Cost"] < BSF["BSF"]["Cost"]:
-            BSF = {"BSF": copy.deepcopy(IBEST["IBEST"])}
+        choice = Engine.ChoiceMatrix(PRM, run.eta, alpha, beta)
+        routes, costs, improved = run.Tours(*run.Travel(choice, dropout))
             
-        #-------------UPDATE PHEROMONE--------------------------------
-        for ant in Ants:
-            PRM = Updatepheromone(Ants[ant]["Route"], costGraph, PRM, rho)
-        
-        #-------------PRINT BSF and IBEST---------------------------------
-        if show == True:
-            print("Iteration Best is ", IBEST["IBEST"]["Cost"] , " and Best so far is ", BSF["BSF"]["Cost"])
+        #-------------EVAPORATE and DEPOSIT PHEROMONE------------------
+        Pheromone.Evaporate(PRM, rho)
+        run.timer.Mark("evaporation")
+        Pheromone.Deposit(PRM, routes, 1/costs, symmetric, cand)
+        run.timer.Mark("deposit")
         
-        iterations -= 1
-        
-    return {"Ants": Ants, "PRM":PRM, "BSF":BSF["BSF"]["Cost"], "IBEST":IBEST["IBEST"]["Cost"] }
+        #-------------MIGRATION: SHARE BSF, REINFORCE and ADOPT INCOMING--
+        incoming = run.Migrate()
+        if incoming is not None:
+            Pheromone.Deposit(PRM, incoming["Route"], 1/incoming["Cost"], symmetric, cand)
+        if run.End():
+            break
+    return run.Finish()
 
 #----------------------------ELITIST ANT SYSTEM-----------------------------------------------------------
 
@@ -140,68 +308,56 @@ def EASUpdatepheromone(route, BSFR, costGraph, pheromoneGraph, e, rho = 0.1):
        BSF : Best sofar route
     pheromoneGraph: pheromone matrix"""
     #--------------------------------GET ARCS--------------------------------------
-    BSFarcs = [(j,BSFR[i+1]) for i,j in enumerate(BSFR) if i < len(BSFR)-1]
-    routearcs = [(j,route[i+1]) for i,j in enumerate(route) if i < len(route)-1]
+    pheromoneGraph = Pheromone.AsArray(pheromoneGraph)
+    i, j = Pheromone.Arcs(route)
     #--------------------COMPUTE COST-----------------------------------------------
     tau = 1/TravelCost(costGraph, route)
     tauBSF = 1/TravelCost(costGraph, BSFR)
-
-    for i,j in routearcs:
-        #--------------------CHECK IF ARC IS IN BSF and Update pheromone------------------
-        if ((i, j) in BSFarcs) or ((j, i) in BSFarcs):
-            pheromoneGraph[i][j] = (1-rho)*(pheromoneGraph[i][j]) + tau + e*tauBSF
-            pheromoneGraph[j][i] = (1-rho)*(pheromoneGraph[j][i]) + tau + e*tauBSF
-        #----------------------------------------------------------------------------------
-        else:
-            pheromoneGraph[i][j] = (1-rho)*(pheromoneGraph[i][j]) + tau 
-            pheromoneGraph[j][i] = (1-rho)*(pheromoneGraph[j][i]) + tau 
+    #--------------------CHECK IF ARC IS IN BSF and Update pheromone------------------
+    tau = tau + e*tauBSF*Pheromone.InTour(BSFR, i, j)
+    pheromoneGraph[i, j] = (1-rho)*(pheromoneGraph[i, j]) + tau
+    pheromoneGraph[j, i] = (1-rho)*(pheromoneGraph[j, i]) + tau
 
     return pheromoneGraph
 
-def EAS(costGraph, Population = 8, alpha = 1, beta = 3, rho = 0.5, iterations = 100, dropout = False, show = False):
+def EAS(costGraph, Population = 8, alpha = 1, beta = 3, rho = 0.5, iterations = 100, dropout = False, show = False, seed = None, batch = False,
+        candidates = None, dtype = np.float64, workers = None,
+        exchange = None, local_search = None, on_iteration = None, timings = False,
+        time_limit = None, target = None, patience = None,
+        checkpoint = None, checkpoint_every = None, checkpoint_seconds = None, resume = None,
+        warm = None, construction = None, layout = None, coords = None, metrics = False,
+        should_stop = None):
     
     """ takes a costgraph, takeoff point, destination point and number of times to travel (iterations)
     and return a tour """
     
     e = len(costGraph)
+    run = Run(costGraph, Population, iterations, show, seed, batch, candidates, dtype, workers,
+              exchange, local_search, on_iteration, timings, time_limit, target, patience,
+              checkpoint, checkpoint_every, checkpoint_seconds, resume, warm, construction, layout, coords,
+              metrics, should_stop)
     #-----------------INITIALIZE PHEROMONE----------------------------------------------------------
-    
-    RT = RandTravel(costGraph)
-    RandCost = TravelCost(costGraph, RT)
-    PRM = [[Population/RandCost for i in range(len(costGraph))] for j in range(len(costGraph))]
-    
-    #-------------------Initialize Ants and Best So Far (BSF) and iteration best IBEST--------------
-    Ants = {"Ant" + str(i+1): {"Route": RT, "Cost": RandCost} for i in range(Population)}
-    BSF = {"BSF": copy.deepcopy(Ants["Ant1"])}
-    IBEST = {"IBEST": copy.deepcopy(Ants["Ant1"])}
-    #-----------------------------------------------------------------------------------------------
-    while iterations > 0:
-        #--------------TRAVEL-----------------------------------------
-        for ant in Ants:
-            Ants[ant]["Route"] = Travel(costGraph, PRM, alpha, beta)
-            Ants[ant]["Cost"] = TravelCost(costGraph, Ants[ant]["Route"])
-            
-        #--------------GET ITERATION BEST------------------------------
-            if Ants[ant] == Ants["Ant1"]:
-                IBEST = {"IBEST": copy.deepcopy(Ants[ant])}
-            elif Ants[ant]["Cost"] < IBEST["IBEST"]["Cost"]:
-                IBEST = {"IBEST": copy.deepcopy(Ants[ant])}
-                
-        #-------------GET BEST SO FAR TOUR and UPDATE tmax--------------
-        if IBEST["IBEST"]["Cost"] < BSF["BSF"]["Cost"]:
-            BSF = {"BSF": copy.deepcopy(IBEST["IBEST"])}
+    PRM = run.Start(Population/run.RandCost)
+    symmetric, cand = run.symmetric, run.cand
+    while run.Next():
+        #--------------TRAVEL (dropout is always on here, as with Travel's default)----
+        choice = Engine.ChoiceMatrix(PRM, run.eta, alpha, beta)
+        routes, costs, improved = run.Tours(*run.Travel(choice, True))
             
-        #-------------UPDATE PHEROMONE--------------------------------
-        for ant in Ants:
-            PRM = EASUpdatepheromone(Ants[ant]["Route"], BSF["BSF"]["Route"], costGraph, PRM, e, rho)
+        #-------------EVAPORATE and DEPOSIT, ARCS IN BSF GET e/BSF EXTRA----
+        Pheromone.Evaporate(PRM, rho)
+        run.timer.Mark("evaporation")
+        inBSF = Pheromone.InTour(run.BSF["Route"], *Pheromone.Arcs(routes), symmetric)
+        Pheromone.Deposit(PRM, routes, 1/costs[:, None] + e*inBSF/run.BSF["Cost"], symmetric, cand)
+        run.timer.Mark("deposit")
             
-        #-------------PRINT BSF and IBEST---------------------------------
-        if show == True:
-            print("Iteration Best is ", IBEST["IBEST"]["Cost"] , " and Best so far is ", BSF["BSF"]["Cost"])
-        
-        iterations -= 1
-        
-    return {"Ants": Ants, "PRM":PRM, "BSF":BSF["BSF"]["Cost"], "IBEST":IBEST["IBEST"]["Cost"] }
+        #-------------MIGRATION: SHARE BSF, REINFORCE and ADOPT INCOMING--
+        incoming = run.Migrate()
+        if incoming is not None:
+            Pheromone.Deposit(PRM, incoming["Route"], 1/incoming["Cost"], symmetric, cand)
+        if run.End():
+            break
+    return run.Finish()
 
 #-------------------------------RANKED_BASED ANT SYSTEM----------------------------------------------------
 
@@ -210,73 +366,63 @@ def RBASUpdatepheromone(route, BSFR, costGraph, pheromoneGraph, rank, w, rho = 0
        BSF : Best sofar route
     pheromoneGraph: pheromone matrix"""
     #--------------------------------GET ARCS--------------------------------------
-    BSFarcs = [(j,BSFR[i+1]) for i,j in enumerate(BSFR) if i < len(BSFR)-1]
-    routearcs = [(j,route[i+1]) for i,j in enumerate(route) if i < len(route)-1]
+    pheromoneGraph = Pheromone.AsArray(pheromoneGraph)
+    i, j = Pheromone.Arcs(route)
     #--------------------COMPUTE COST-----------------------------------------------
     tau = 1/TravelCost(costGraph, route)
     tauBSF = 1/TravelCost(costGraph, BSFR)
-
-    for i,j in routearcs:
-        #--------------------CHECK IF ARC IS IN BSF and Update pheromone------------------
-        if ((i, j) in BSFarcs) or ((j, i) in BSFarcs):
-            pheromoneGraph[i][j] = (1-rho)*(pheromoneGraph[i][j]) + (w-rank)*tau + w*tauBSF
-            pheromoneGraph[j][i] = (1-rho)*(pheromoneGraph[j][i]) + (w-rank)*tau + w*tauBSF
-        #----------------------------------------------------------------------------------
-        else:
-            pheromoneGraph[i][j] = (1-rho)*(pheromoneGraph[i][j]) + (w-rank)*tau 
-            pheromoneGraph[j][i] = (1-rho)*(pheromoneGraph[j][i]) + (w-rank)*tau 
+    #--------------------CHECK IF ARC IS IN BSF and Update pheromone------------------
+    tau = (w-rank)*tau + w*tauBSF*Pheromone.InTour(BSFR, i, j)
+    pheromoneGraph[i, j] = (1-rho)*(pheromoneGraph[i, j]) + tau
+    pheromoneGraph[j, i] = (1-rho)*(pheromoneGraph[j, i]) + tau
 
     return pheromoneGraph
 
-def RBAS(costGraph, Population = 8, alpha = 1, beta = 3, rho = 0.1, iterations = 100, dropout = False, show = False):
+def RBAS(costGraph, Population = 8, alpha = 1, beta = 3, rho = 0.1, iterations = 100, dropout = False, show = False, seed = None, batch = False,
+        candidates = None, dtype = np.float64, workers = None,
+        exchange = None, local_search = None, on_iteration = None, timings = False,
+        time_limit = None, target = None, patience = None,
+        checkpoint = None, checkpoint_every = None, checkpoint_seconds = None, resume = None,
+        warm = None, construction = None, layout = None, coords = None, metrics = False,
+        should_stop = None):
     
     """ takes a costgraph, takeoff point, destination point and number of times to travel (iterations)
     and return a tour """
     w = 6
+    run = Run(costGraph, Population, iterations, show, seed, batch, candidates, dtype, workers,
+              exchange, local_search, on_iteration, timings, time_limit, target, patience,
+              checkpoint, checkpoint_every, checkpoint_seconds, resume, warm, construction, layout, coords,
+              metrics, should_stop)
     #-----------------INITIALIZE PHEROMONE----------------------------------------------------------
-    RT = RandTravel(costGraph)
-    RandCost = TravelCost(costGraph, RandTravel(costGraph))
-    PRM = [[Population/RandCost for i in range(len(costGraph))] for j in range(len(costGraph))]
-    
-    #-------------------Initialize Ants and Best So Far (BSF) and iteration best IBEST--------------
-    Ants = {"Ant" + str(i+1): {"Route": RT, "Cost": RandCost} for i in range(Population)}
-    BSF = {"BSF": copy.deepcopy(Ants["Ant1"])}
-    IBEST = {"IBEST": copy.deepcopy(Ants["Ant1"])}
-    #-----------------------------------------------------------------------------------------------
-    while iterations > 0:
-        #--------------TRAVEL-----------------------------------------
-        for ant in Ants:
-            Ants[ant]["Route"] = Travel(costGraph, PRM, alpha, beta)
-            Ants[ant]["Cost"] = TravelCost(costGraph, Ants[ant]["Route"])
-            
-        #--------------GET ITERATION BEST------------------------------
-            if Ants[ant] == Ants["Ant1"]:
-                IBEST = {"IBEST": copy.deepcopy(Ants[ant])}
-            elif Ants[ant]["Cost"] < IBEST["IBEST"]["Cost"]:
-                IBEST = {"IBEST": copy.deepcopy(Ants[ant])}
-                
-        #-------------GET BEST SO FAR TOUR and UPDATE tmax--------------
-        if IBEST["IBEST"]["Cost"] < BSF["BSF"]["Cost"]:
-            BSF = {"BSF": copy.deepcopy(IBEST["IBEST"])}
+    PRM = run.Start(Population/run.RandCost)
+    symmetric, cand = run.symmetric, run.cand
+    while run.Next():
+        #--------------TRAVEL (dropout is always on here, as with Travel's default)----
+        choice = Engine.ChoiceMatrix(PRM, run.eta, alpha, beta)
+        routes, costs, improved = run.Tours(*run.Travel(choice, True))
             
         #---------------RANK ANTS---------------------------------------      
-        Ranks = sorted([(Ants[ant]["Cost"], ant) for ant in Ants]) 
-        for i,j in enumerate(Ranks):
-            Ants[j[1]]["Rank"] = i+1
+        rank = np.empty(Population, dtype = np.int64)
+        rank[np.argsort(costs, kind = "stable")] = np.arange(1, Population + 1)
+        for k, ant in enumerate(run.Ants):
+            run.Ants[ant]["Rank"] = int(rank[k])
             
-        #-------------UPDATE PHEROMONE--------------------------------
-        for ant in Ants:
-            r = Ants[ant]["Rank"]
-            if r < w:
-                PRM = RBASUpdatepheromone(Ants[ant]["Route"], BSF["BSF"]["Route"], costGraph, PRM, r, w, rho)
+        #-------------EVAPORATE and DEPOSIT FOR THE w-1 BEST ANTS--------
+        ranked = rank < w
+        Pheromone.Evaporate(PRM, rho)
+        run.timer.Mark("evaporation")
+        inBSF = Pheromone.InTour(run.BSF["Route"], *Pheromone.Arcs(routes[ranked]), symmetric)
+        Pheromone.Deposit(PRM, routes[ranked], ((w - rank[ranked])/costs[ranked])[:, None]
+                          + w*inBSF/run.BSF["Cost"], symmetric, cand)
+        run.timer.Mark("deposit")
                 
-        #-------------PRINT BSF and IBEST---------------------------------
-        if show == True:
-            print("Iteration Best is ", IBEST["IBEST"]["Cost"] , " and Best so far is ", BSF["BSF"]["Cost"])
-        
-        iterations -= 1
-        
-    return {"Ants": Ants, "PRM":PRM, "BSF":BSF["BSF"]["Cost"], "IBEST":IBEST["IBEST"]["Cost"] }
+        #-------------MIGRATION: SHARE BSF, REINFORCE and ADOPT INCOMING--
+        incoming = run.Migrate()
+        if incoming is not None:
+            Pheromone.Deposit(PRM, incoming["Route"], 1/incoming["Cost"], symmetric, cand)
+        if run.End():
+            break
+    return run.Finish()
 
 #----------------------------ANT COLONY SYSTEM-------------------------------------------------------------------
 
@@ -286,56 +432,31 @@ def PseudoNextNode(Connections, Pseudovalues):
 def ACSTravel(costGraph, pheromoneGraph, t0, eps = 0.1, q0 = 0.9, alpha=1, beta=2 , dropout = False):
     """ Takes a cost graph, pheromone graph and returns
         a hamiltonian circle route """
-    
-    allNodes = [Nodes for Nodes in range(len(costGraph))]
-    startNode = random.choice(allNodes)
-    TAKEN = [startNode]
-    availableNodes = allNodes[:]
-    availableNodes.remove(startNode)
-
-    # make sequencial choices 
-    while len(availableNodes) > 0:
-        
-        #--------------- DROP OUT -------------------------------------------------------------------
-        usedNodes = availableNodes[:]
-        if dropout == True and len(usedNodes) > 1:
-            [usedNodes.remove(random.choice(usedNodes)) for i in range(len(usedNodes)) 
-             if (random.random()<0.005 and len(usedNodes)>1)]
-        #--------------------------------------------------------------------------------------------
-        
-        pheromones = [pheromoneGraph[startNode][availableNode] for availableNode in usedNodes]
-        costs = [1/costGraph[startNode][availableNode] for availableNode in usedNodes]
-        #------------------CHOOSE NODE--------------------------------------------------------------   
-        if random.random() < q0:
-            Pseudovalues = [(i)*(j**beta) for i,j in zip(pheromones,costs)]
-            nextNode = PseudoNextNode(usedNodes, Pseudovalues)
-        else:
-            numerators = [(i**alpha)*(j**beta) for i,j in zip(pheromones,costs)]
-            probabilities = [i/sum(numerators) for i in numerators]
-            RouletteProb = [ sum(probabilities[:i+1]) for i in range(len(probabilities)) ]
-            nextNode = NextNode(usedNodes, RouletteProb)
-        #----------------LOCAL PHEROMONE UPDATE-----------------------------------------------------
-        pheromoneGraph = ACSUpdatepheromoneLocal(pheromoneGraph, startNode, nextNode, t0, eps)
-        
-        TAKEN.append(nextNode)
-        startNode = TAKEN[-1]
-        availableNodes.remove(nextNode)
-        
-    TAKEN.append(TAKEN[0])
-    return TAKEN
-
-def ACSUpdatepheromone(route, costGraph, pheromoneGraph, rho = 0.1):
+    tau = np.array(pheromoneGraph, dtype = float)
+    etaB = Engine.Heuristic(costGraph)**beta
+    route = Engine.ArrayACSTravel(tau**alpha*etaB, tau*etaB, tau, etaB, t0, eps, q0, alpha,
+                                  dropout = dropout)
+    #----------------WRITE BACK THE LOCAL PHEROMONE UPDATES---------------------------------------
+    for i, j in zip(route[:-1], route[1:]):
+        pheromoneGraph[i][j] = tau[i, j]
+        pheromoneGraph[j][i] = tau[j, i]
+    return route.tolist()
+
+def ACSUpdatepheromone(route, costGraph, pheromoneGraph, rho = 0.1, cand = None, symmetric = True):
     """route : route taken
        BSF : Best sofar route
-    pheromoneGraph: pheromone matrix"""
+    pheromoneGraph: pheromone matrix (any Pheromone layout)
+    cand: candidate lists when pheromoneGraph only holds the candidate arcs
+    symmetric: False updates the arcs in the route's direction only"""
     #--------------------------------GET ARCS--------------------------------------
-    routearcs = [(j,route[i+1]) for i,j in enumerate(route) if i < len(route)-1]
+    pheromoneGraph = Pheromone.AsArray(pheromoneGraph)
+    starts, ends = Pheromone.Arcs(route)
     #--------------------COMPUTE COST-----------------------------------------------
     tau = 1/TravelCost(costGraph, route)
     
-    for i,j in routearcs:
-        pheromoneGraph[i][j] = (1-rho)*(pheromoneGraph[i][j]) + rho*tau
-        pheromoneGraph[j][i] = (1-rho)*(pheromoneGraph[i][j]) + rho*tau
+    for i, j in Pheromone.Pairs(pheromoneGraph, starts, ends, symmetric):
+        key, found = Pheromone.Key(pheromoneGraph, i, j, cand)
+        pheromoneGraph[key] = (1-rho)*(pheromoneGraph[key]) + rho*tau
     return pheromoneGraph
 
 def ACSUpdatepheromoneLocal(pheromoneGraph, start, end, t0, eps = 0.1):
@@ -343,121 +464,106 @@ def ACSUpdatepheromoneLocal(pheromoneGraph, start, end, t0, eps = 0.1):
     pheromoneGraph[end][start] = (1-eps)*pheromoneGraph[end][start] + eps*t0
     return pheromoneGraph
 
-def ACS(costGraph, Population = 10, eps = 0.1, q0 = 0.9, alpha = 1, beta = 3, rho = 0.1, iterations = 100, dropout = False, show = False):
+def ACS(costGraph, Population = 10, eps = 0.1, q0 = 0.9, alpha = 1, beta = 3, rho = 0.1, iterations = 100, dropout = False, show = False, seed = None, batch = False,
+        candidates = None, dtype = np.float64, workers = None,
+        exchange = None, local_search = None, on_iteration = None, timings = False,
+        time_limit = None, target = None, patience = None,
+        checkpoint = None, checkpoint_every = None, checkpoint_seconds = None, resume = None,
+        warm = None, construction = None, layout = None, coords = None, metrics = False,
+        should_stop = None):
     
     """ takes a costgraph, takeoff point, destination point and number of times to travel (iterations)
     and return a tour """
     
-    #-----------------INITIALIZE PHEROMONE and SET UPPER and LOWER Limit-----------------------
-    RT = RandTravel(costGraph)
-    RandCost = TravelCost(costGraph, RT)
-    t0 = 1/( (len(costGraph))*RandCost )
-                
-    PRM = [[t0 for i in range(len(costGraph))] for j in range(len(costGraph))]
-    
-    #-------------------Initialize Ants and Best So Far (BSF) and iteration best IBEST--------------
-    Ants = {"Ant" + str(i+1): {"Route": RT, "Cost": RandCost} for i in range(Population)}
-    BSF = {"BSF": copy.deepcopy(Ants["Ant1"])}
-    IBEST = {"IBEST": copy.deepcopy(Ants["Ant1"])}
-    #-----------------------------------------------------------------------------------------------
-    while iterations > 0:
+    run = Run(costGraph, Population, iterations, show, seed, batch, candidates, dtype, workers,
+              exchange, local_search, on_iteration, timings, time_limit, target, patience,
+              checkpoint, checkpoint_every, checkpoint_seconds, resume, warm, construction, layout, coords,
+              metrics, should_stop)
+    #-----------------INITIALIZE PHEROMONE-----------------------------------------------------------
+    t0 = 1/( (len(costGraph))*run.RandCost )
+    cost, symmetric, cand = run.cost, run.symmetric, run.cand
+    PRM = run.Start(t0, lambda PRM, tour: ACSUpdatepheromone(tour["Route"], cost, PRM, rho, cand, symmetric))
+    t0 = run.variables.get("t0", t0)
+    etaB = run.eta**beta
+    while run.Next():
         #--------------TRAVEL-----------------------------------------
-        for ant in Ants:
-            Ants[ant]["Route"] = ACSTravel(costGraph, PRM, t0, eps , q0 , alpha, beta, dropout)
-            Ants[ant]["Cost"] = TravelCost(costGraph, Ants[ant]["Route"])
-            
-        #--------------GET ITERATION BEST------------------------------
-            if Ants[ant] == Ants["Ant1"]:
-                IBEST = {"IBEST": copy.deepcopy(Ants[ant])}
-            elif Ants[ant]["Cost"] < IBEST["IBEST"]["Cost"]:
-                IBEST = {"IBEST": copy.deepcopy(Ants[ant])}
-                
-        #-------------GET BEST SO FAR TOUR and UPDATE tmax--------------
-        if IBEST["IBEST"]["Cost"] < BSF["BSF"]["Cost"]:
-            BSF = {"BSF": copy.deepcopy(IBEST["IBEST"])}
+        choice, greedy = Engine.ChoiceMatrix(PRM, etaB, alpha, 1), Engine.ChoiceMatrix(PRM, etaB, 1, 1)
+        routes, costs, improved = run.Tours(*run.ACSTravel(choice, greedy, etaB, t0, eps, q0, alpha, dropout))
             
         #-------------UPDATE PHEROMONE BY IBEST or BSF------------------
-        ACSUpdatepheromone(BSF["BSF"]["Route"], costGraph, PRM, rho)
-        #ACSUpdatepheromone(IBEST["IBEST"]["Route"], costGraph, PRM, rho)
-        
-        #-------------PRINT BSF and IBEST---------------------------------
-        if show == True:
-            print("Iteration Best is ", IBEST["IBEST"]["Cost"] , " and Best so far is ", BSF["BSF"]["Cost"])
+        ACSUpdatepheromone(run.BSF["Route"], cost, PRM, rho, cand, symmetric)
+        run.timer.Mark("deposit")
+        #ACSUpdatepheromone(run.IBEST["Route"], costGraph, PRM, rho)
         
-        iterations -= 1
-        
-    return {"Ants": Ants, "PRM":PRM, "BSF":BSF["BSF"]["Cost"], "IBEST":IBEST["IBEST"]["Cost"] }
+        #-------------MIGRATION: SHARE BSF, REINFORCE and ADOPT INCOMING--
+        incoming = run.Migrate()
+        if incoming is not None:
+            ACSUpdatepheromone(incoming["Route"], cost, PRM, rho, cand, symmetric)
+        if run.End(t0 = t0):
+            break
+    return run.Finish(t0 = t0)
 
 #---------------------------------MIN MAX ANT SYSTEM--------------------------------------------------------
 
-def MMASUpdatepheromone(route, costGraph, pheromoneGraph, tmax):
+def MMASUpdatepheromone(route, costGraph, pheromoneGraph, tmax, cand = None, symmetric = True):
     """route : route taken
        BSF : Best sofar route
-    pheromoneGraph: pheromone matrix"""
-    #--------------------------------GET ARCS--------------------------------------
-    routearcs = [(j,route[i+1]) for i,j in enumerate(route) if i < len(route)-1]
+    pheromoneGraph: pheromone matrix (any Pheromone layout)
+    cand: candidate lists when pheromoneGraph only holds the candidate arcs
+    symmetric: False updates the arcs in the route's direction only"""
     #--------------------COMPUTE COST-----------------------------------------------
     tau = 1/TravelCost(costGraph, route)
-
-    for i,j in routearcs:
-        pheromoneGraph[i][j] += tau
-        if pheromoneGraph[i][j] > tmax:
-            pheromoneGraph[i][j] = tmax
-            pheromoneGraph[j][i] = tmax
-        else:
-            pheromoneGraph[j][i] += tau
-    return pheromoneGraph
-
-def MMASevaporate(route, pheromoneGraph, tmin, rho = 0.02):
+    #--------------------DEPOSIT and CLIP AT tmax------------------------------------
+    pheromoneGraph = Pheromone.AsArray(pheromoneGraph)
+    if Kernels.Clampable(pheromoneGraph, cand):
+        return Kernels.DepositClamp(pheromoneGraph, route, tau, tmax, symmetric)
+    pheromoneGraph = Pheromone.Deposit(pheromoneGraph, route, tau, symmetric, cand)
+    return Pheromone.Clamp(pheromoneGraph, route, tmax = tmax, cand = cand, symmetric = symmetric)
+
+def MMASevaporate(route, pheromoneGraph, tmin, rho = 0.02, symmetric = True):
     #------------------------------------------------------------------------------
-    routearcs = [(j,route[i+1]) for i,j in enumerate(route) if i < len(route)-1]    
-    #--------------------COMPUTE COST----------------------------------------------
-    for i,j in routearcs:
-        pheromoneGraph[i][j] = (1-rho)*(pheromoneGraph[i][j])
-        if pheromoneGraph[i][j] < tmin:
-            pheromoneGraph[i][j] = tmin
-            pheromoneGraph[j][i] = tmin
-        else:
-            pheromoneGraph[j][i] = (1-rho)*(pheromoneGraph[j][i])
-    return pheromoneGraph
-
-def MMAS(costGraph, Population = 8, alpha = 1, beta = 3, rho = 0.02, iterations = 100, dropout = False, show = False):
+    pheromoneGraph = Pheromone.AsArray(pheromoneGraph)
+    if Kernels.Clampable(pheromoneGraph):
+        return Kernels.EvaporateClamp(pheromoneGraph, route, tmin, rho, symmetric)
+    starts, ends = Pheromone.Arcs(route)
+    #--------------------EVAPORATE and CLIP AT tmin--------------------------------
+    for i, j in Pheromone.Pairs(pheromoneGraph, starts, ends, symmetric):
+        key, found = Pheromone.Key(pheromoneGraph, i, j)
+        pheromoneGraph[key] = (1-rho)*(pheromoneGraph[key])
+    return Pheromone.Clamp(pheromoneGraph, route, tmin = tmin, symmetric = symmetric)
+
+def MMAS(costGraph, Population = 8, alpha = 1, beta = 3, rho = 0.02, iterations = 100, dropout = False, show = False, seed = None, batch = False,
+        candidates = None, dtype = np.float64, workers = None,
+        exchange = None, local_search = None, on_iteration = None, timings = False,
+        time_limit = None, target = None, patience = None,
+        checkpoint = None, checkpoint_every = None, checkpoint_seconds = None, resume = None,
+        warm = None, construction = None, layout = None, coords = None, metrics = False,
+        should_stop = None):
     
     """ takes a costgraph, takeoff point, destination point and number of times to travel (iterations)
     and return a tour """
     t = 0   # stagnation measure
+    run = Run(costGraph, Population, iterations, show, seed, batch, candidates, dtype, workers,
+              exchange, local_search, on_iteration, timings, time_limit, target, patience,
+              checkpoint, checkpoint_every, checkpoint_seconds, resume, warm, construction, layout, coords,
+              metrics, should_stop)
     #-----------------INITIALIZE PHEROMONE and SET UPPER and LOWER Limit-----------------------
-    RT = RandTravel(costGraph)
-    RandCost = TravelCost(costGraph, RT)
-    tmax = 1/(rho*RandCost)
+    tmax = 1/(rho*run.RandCost)
     num = tmax*(1- (0.05**(1/Population)))
     den = ((len(costGraph)/2) - 1 )*(0.05**(1/Population))          
     tmin = num/den
-                
-    PRM = [[tmax for i in range(len(costGraph))] for j in range(len(costGraph))]
-    
-        #-------------------Initialize Ants and Best So Far (BSF) and iteration best IBEST--------------
-    Ants = {"Ant" + str(i+1): {"Route": RT, "Cost": RandCost} for i in range(Population)}
-    BSF = {"BSF": copy.deepcopy(Ants["Ant1"])}
-    IBEST = {"IBEST": copy.deepcopy(Ants["Ant1"])}
-    #-----------------------------------------------------------------------------------------------
-    while iterations > 0:
+    cost, symmetric, cand = run.cost, run.symmetric, run.cand
+    PRM = run.Start(tmax, lambda PRM, tour: MMASUpdatepheromone(tour["Route"], cost, PRM, tmax, cand, symmetric))
+    if run.variables:
+        tmax, tmin, t = run.variables["tmax"], run.variables["tmin"], run.variables["t"]
+    while run.Next():
         #--------------TRAVEL-----------------------------------------
-        for ant in Ants:
-            Ants[ant]["Route"] = Travel(costGraph, PRM, alpha, beta, dropout)
-            Ants[ant]["Cost"] = TravelCost(costGraph, Ants[ant]["Route"])
+        choice = Engine.ChoiceMatrix(PRM, run.eta, alpha, beta)
+        routes, costs, improved = run.Tours(*run.Travel(choice, dropout))
             
-        #--------------GET ITERATION BEST------------------------------
-            if Ants[ant] == Ants["Ant1"]:
-                IBEST = {"IBEST": copy.deepcopy(Ants[ant])}
-            elif Ants[ant]["Cost"] < IBEST["IBEST"]["Cost"]:
-                IBEST = {"IBEST": copy.deepcopy(Ants[ant])}
-                
-        #-------------GET BEST SO FAR TOUR and UPDATE tmax--------------
-        if IBEST["IBEST"]["Cost"] < BSF["BSF"]["Cost"]:
-            BSF = {"BSF": copy.deepcopy(IBEST["IBEST"])}
-            
-            tmax = 1/(rho*BSF["BSF"]["Cost"])
+        #-------------UPDATE tmax WITH THE BEST SO FAR TOUR--------------
+        if improved:
+            tmax = 1/(rho*run.BSF["Cost"])
             num = tmax*(1- (0.05**(1/Population)))
             tmin = num/den
             t = 0
@@ -467,23 +573,29 @@ def MMAS(costGraph, Population = 8, alpha = 1, beta = 3, rho = 0.02, iterations
         #---------------OCCASIONAL PHEROMONE REINITIALIZATION-----------
         if t >= random.uniform(15,30):
             # print("REINITALIZATION INITIATED ")
-            PRM = [[tmax for i in range(len(costGraph))] for j in range(len(costGraph))]
+            PRM.fill(tmax)
             t = 0
-        #---------------EVAPORATE PHEROMONE FROM ALL ANTS---------------      
-        for ant in Ants:
-            PRM = MMASevaporate(Ants[ant]["Route"], PRM, tmin, rho) 
+        #---------------EVAPORATE PHEROMONE ON EVERY ARC----------------      
+        Pheromone.Evaporate(PRM, rho, tmin)
+        run.timer.Mark("evaporation")
             
         #-------------UPDATE PHEROMONE BY IBEST or BSF------------------
         
         if random.random()<0.5:
-            PRM = MMASUpdatepheromone(IBEST["IBEST"]["Route"], costGraph, PRM, tmax)
+            MMASUpdatepheromone(run.IBEST["Route"], cost, PRM, tmax, cand, symmetric)
         else:
-            PRM = MMASUpdatepheromone(BSF["BSF"]["Route"], costGraph, PRM, tmax)
+            MMASUpdatepheromone(run.BSF["Route"], cost, PRM, tmax, cand, symmetric)
+        run.timer.Mark("deposit")
        
-        #-------------PRINT BSF and IBEST---------------------------------
-        if show == True:
-            print("Iteration Best is ", IBEST["IBEST"]["Cost"] , " and Best so far is ", BSF["BSF"]["Cost"])
-        
-        iterations -= 1
-        
-    return {"Ants": Ants, "PRM":PRM, "BSF":BSF["BSF"]["Cost"], "IBEST":IBEST["IBEST"]["Cost"] }
\ No newline at end of file
+        #-------------MIGRATION: SHARE BSF, REINFORCE and ADOPT INCOMING--
+        incoming = run.Migrate()
+        if incoming is not None:
+            if run.BSF is incoming:
+                tmax = 1/(rho*run.BSF["Cost"])
+                num = tmax*(1- (0.05**(1/Population)))
+                tmin = num/den
+                t = 0
+            MMASUpdatepheromone(incoming["Route"], cost, PRM, tmax, cand, symmetric)
+        if run.End(tmax = tmax, tmin = tmin, t = t):
+            break
+    return run.Finish(tmax = tmax, tmin = tmin, t = t)
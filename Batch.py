@@ -0,0 +1,203 @@
+# Batch solving: streams instances (cost matrices or coordinate/TSPLIB files) through a
+# process pool and yields every result as soon as its instance is solved. Submission is
+# throttled by the number and the estimated memory of the instances in flight, so a
+# generator of instances is only read as fast as the pool keeps up (backpressure).
+# Matrices travel in shared memory slots that are reused for instances of the same size,
+# files are read by the workers into cost buffers they keep per size.
+import os
+import time
+import collections
+import concurrent.futures
+from multiprocessing import shared_memory, resource_tracker
+import numpy as np
+import RouteMatrix
+from Islands import VARIANTS
+
+KEEP = ("BSF", "IBEST", "Route", "Stop", "Iterations")
+CACHED = 8          # worker side: shared slots and file buffers kept per process
+
+ATTACHED = collections.OrderedDict()    # worker side: slot name -> (SharedMemory, ndarray)
+BUFFERS = collections.OrderedDict()     # worker side: (n, dtype) -> cost buffer for files
+
+def Evict(cache):
+    """ drops the least recently used entries of a worker side cache """
+    while len(cache) > CACHED:
+        key, value = cache.popitem(last = False)
+        if isinstance(value, tuple):
+            shm, view = value
+            del view
+            try:
+                shm.close()
+            except BufferError:
+                pass        # still referenced, the mapping goes with the last reference
+
+def Attach(name, shape, dtype):
+    """ worker side view of a shared slot. A reused slot keeps its name, so the
+        view attached for an earlier instance of that size is reused as well """
+    if name in ATTACHED:
+        ATTACHED.move_to_end(name)
+    else:
+        shm = shared_memory.SharedMemory(name = name)
+        ATTACHED[name] = (shm, np.ndarray(shape, dtype = dtype, buffer = shm.buf))
+        Evict(ATTACHED)
+    return ATTACHED[name][1]
+
+def Buffer(n, dtype):
+    """ worker side n x n cost buffer, reused for every file of n cities """
+    key = (n, np.dtype(dtype).str)
+    if key in BUFFERS:
+        BUFFERS.move_to_end(key)
+    else:
+        BUFFERS[key] = np.empty((n, n), dtype = dtype)
+        Evict(BUFFERS)
+    return BUFFERS[key]
+
+def Load(filepath, dtype = np.float64):
+    """ RouteMatrix.TSRM computed into the reused buffer of its size """
+    if RouteMatrix.IsTSPLIB(filepath):
+        problem = RouteMatrix.ReadTSPLIB(filepath)
+        kind = problem.get("EDGE_WEIGHT_TYPE", "EUC_2D")
+        if kind == "EXPLICIT":
+            return RouteMatrix.TSRM(filepath, dtype)
+        coords = problem["COORDS"]
+    else:
+        kind, coords = "EXACT", RouteMatrix.Coordinates(filepath)
+    return RouteMatrix.DistanceMatrix(coords, kind, dtype, out = Buffer(len(coords), dtype))
+
+def Work(task):
+    """ solves one instance in a worker and returns the kept part of the result """
+    index, variant, instance, params, keep, dtype = task
+    start = time.perf_counter()
+    try:
+        if isinstance(instance, tuple):
+            costGraph = Attach(*instance)
+        elif isinstance(instance, (str, os.PathLike)):
+            costGraph = Load(instance, dtype)
+        else:
+            costGraph = instance
+        result = VARIANTS[variant](costGraph, **params)
+        result, error = {key: result[key] for key in keep}, None
+    except Exception as exception:
+        result, error = None, repr(exception)
+    return {"index": index, "result": result, "error": error, "seconds": time.perf_counter() - start}
+
+#------------------------------------PARENT SIDE---------------------------------------------------------
+
+class Slots:
+    """ shared memory slots for the matrices handed to the workers. A slot goes
+        back to the free list of its shape when its instance is done, so
+        instances of the same size reuse it; at most `spare` free slots are kept """
+
+    def __init__(self, spare = 8):
+        self.spare = spare
+        self.free = collections.OrderedDict()      # (shape, dtype) -> [SharedMemory]
+
+    def Take(self, array):
+        key = (array.shape, array.dtype.str)
+        shm = self.free[key].pop() if self.free.get(key) else \
+            shared_memory.SharedMemory(create = True, size = max(array.nbytes, 1))
+        if key in self.free and not self.free[key]:
+            del self.free[key]
+        np.copyto(np.ndarray(array.shape, dtype = array.dtype, buffer = shm.buf), array)
+        return key, shm, (shm.name, array.shape, array.dtype.str)
+
+    def Give(self, key, shm):
+        self.free.setdefault(key, []).append(shm)
+        self.free.move_to_end(key)
+        while sum(len(slots) for slots in self.free.values()) > self.spare:
+            oldest = next(iter(self.free))
+            self.Release(self.free[oldest].pop(0))
+            if not self.free[oldest]:
+                del self.free[oldest]
+
+    @staticmethod
+    def Release(shm):
+        shm.close()
+        shm.unlink()
+
+    def Close(self):
+        for slots in self.free.values():
+            for shm in slots:
+                self.Release(shm)
+        self.free.clear()
+
+def Size(instance):
+    """ number of cities of an instance, read from the TSPLIB header
+        or estimated from the line count of a coordinate file """
+    if not isinstance(instance, (str, os.PathLike)):
+        return len(instance)
+    with open(instance) as f:
+        if RouteMatrix.IsTSPLIB(instance):
+            for line in f:
+                if line.split(":")[0].strip().upper() == "DIMENSION":
+                    return int(line.split(":", 1)[1])
+        return sum(1 for line in f if line.strip())
+
+def Footprint(instance, dtype = np.float64):
+    """ estimated worker memory of an instance: the cost, pheromone,
+        heuristic and choice matrices, n x n each """
+    try:
+        n = Size(instance)
+    except OSError:
+        n = 0       # unreadable file: the worker reports the error
+    return 4*n**2*np.dtype(dtype).itemsize
+
+def Solve(instances, variant = "MMAS", workers = None, time_limit = None, max_pending = None, max_bytes = None,
+          keep = KEEP, dtype = np.float64, **params):
+    """ takes an iterable (or generator) of instances and yields
+        {"index", "result", "error", "seconds"} for each as soon as it is solved,
+        in completion order. An instance is a cost matrix, a coordinate/TSPLIB
+        file path, or a dict {"instance": ..., **overrides} whose overrides
+        (time_limit, seed, iterations, ...) replace the shared params for that
+        instance. workers: pool size (default: every cpu), max_pending: instances
+        in flight (default 2 per worker), max_bytes: bound on their estimated
+        memory (one instance is always let through), keep: result keys sent back """
+    workers = workers or os.cpu_count()
+    max_pending = max_pending or 2*workers
+    # the tracker must run before the pool forks, so workers share it (see Parallel.Colony)
+    resource_tracker.ensure_running()
+    slots = Slots(spare = max_pending)
+    pool = concurrent.futures.ProcessPoolExecutor(workers)
+    items = enumerate(instances)
+    pending = {}        # future -> (slot, footprint)
+    inflight = 0
+    held = None         # next instance, waiting for memory to free up
+    try:
+        while True:
+            #-----------------SUBMIT while there is room (BACKPRESSURE)-----------------------------
+            while len(pending) < max_pending:
+                if held is None:
+                    held = next(items, None)
+                    if held is None:
+                        break
+                index, item = held
+                options = dict(item) if isinstance(item, dict) else {"instance": item}
+                instance = options.pop("instance")
+                footprint = Footprint(instance, dtype)
+                if pending and max_bytes is not None and inflight + footprint > max_bytes:
+                    break
+                held, slot = None, None
+                if not isinstance(instance, (str, os.PathLike)):
+                    key, shm, instance = slots.Take(np.asarray(instance, dtype = dtype))
+                    slot = (key, shm)
+                run = dict(params, time_limit = time_limit)
+                run.update(options)
+                future = pool.submit(Work, (index, variant, instance, run, keep, dtype))
+                pending[future] = (slot, footprint)
+                inflight += footprint
+            if not pending:
+                break
+            #-----------------YIELD RESULTS AS THEY COMPLETE----------------------------------------
+            done, waiting = concurrent.futures.wait(pending, return_when = concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                slot, footprint = pending.pop(future)
+                inflight -= footprint
+                if slot is not None:
+                    slots.Give(*slot)
+                yield future.result()
+    finally:
+        pool.shutdown(wait = True, cancel_futures = True)
+        for slot, footprint in pending.values():
+            if slot is not None:
+                Slots.Release(slot[1])
+        slots.Close()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+# Benchmark harness: runs the ACO variants on seeded random graphs (RTSP.RandGraph)
+# and on coordinate/TSPLIB files (RouteMatrix.TSRM) and saves the timings and tour
+# costs as JSON, optionally compared against a stored baseline.
+#
+#   python Benchmark.py --sizes 20 100 500 --seeds 0 1 2 --output new.json
+#   python Benchmark.py --files berlin52.tsp --engines loop batch --baseline old.json
+import os
+import sys
+import json
+import time
+import random
+import inspect
+import argparse
+import platform
+import tracemalloc
+import numpy as np
+import RTSP
+import RouteMatrix
+from Islands import VARIANTS
+
+ENGINES = {"loop": {}, "batch": {"batch": True}, "workers": {"batch": True}}
+
+#------------------------------------INSTANCES-----------------------------------------------------------
+
+def Instances(sizes = (), files = (), graphSeed = 0):
+    """ yields (name, costgraph) for the random graphs of every size and for every file """
+    for n in sizes:
+        yield "rand%d-%d" % (n, graphSeed), RTSP.RandGraph(n, seed = graphSeed, dtype = np.float64)
+    for filepath in files:
+        yield os.path.basename(filepath), RouteMatrix.TSRM(filepath)
+
+#------------------------------------RUNS----------------------------------------------------------------
+
+def Population(variant, params):
+    return params.get("Population", inspect.signature(VARIANTS[variant]).parameters["Population"].default)
+
+def Run(variant, costGraph, seed, params):
+    """ one timed solver run. The exchange hook records the best so far cost
+        after every iteration, so the rates exclude the setup time """
+    random.seed(seed)
+    trace = []
+
+    def exchange(iteration, best):
+        trace.append((time.perf_counter(), best["Cost"]))
+        return None
+
+    start = time.perf_counter()
+    result = VARIANTS[variant](costGraph, seed = seed, exchange = exchange, **params)
+    total = time.perf_counter() - start
+    iterations = len(trace)
+    loop = trace[-1][0] - trace[0][0] if iterations > 1 else total
+    rate = (iterations - 1)/loop if iterations > 1 and loop > 0 else iterations/total
+    return {"seed": seed, "seconds": total, "iterations": iterations, "iterations_per_sec": rate,
+            "ants_per_sec": rate*Population(variant, params), "best": float(result["BSF"]),
+            "trace": [(t - start, c) for t, c in trace]}
+
+def PeakMemory(variant, costGraph, seed, params, iterations = 2):
+    """ peak traced allocation (MB) of a short run. Kept out of the timed
+        runs because tracing slows every allocation down """
+    random.seed(seed)
+    tracemalloc.start()
+    try:
+        VARIANTS[variant](costGraph, seed = seed, **dict(params, iterations = iterations))
+        return tracemalloc.get_traced_memory()[1]/2**20
+    finally:
+        tracemalloc.stop()
+
+def TimeToTarget(trace, target):
+    """ seconds until the best so far cost reached target, or None """
+    return next((t for t, c in trace if c <= target), None)
+
+def Summarize(record, runs, reference, gap):
+    """ fills record with the statistics over the seeds of one configuration """
+    target = reference*(1 + gap)
+    hits = [s for s in (TimeToTarget(run["trace"], target) for run in runs) if s is not None]
+    best = [run["best"] for run in runs]
+    record.update({"iterations_per_sec": float(np.mean([run["iterations_per_sec"] for run in runs])),
+                   "ants_per_sec": float(np.mean([run["ants_per_sec"] for run in runs])),
+                   "seconds": float(np.mean([run["seconds"] for run in runs])),
+                   "best_cost": float(min(best)), "mean_cost": float(np.mean(best)),
+                   "reference": reference, "target_gap": gap, "target_hits": len(hits),
+                   "time_to_target": float(np.mean(hits)) if hits else None,
+                   "runs": [{k: v for k, v in run.items() if k != "trace"} for run in runs]})
+    return record
+
+def Benchmark(variants, instances, seeds, engines = ("batch",), gap = 0.05, optimum = None, memory = True,
+              **params):
+    """ runs every variant x instance x engine over the seeds and returns the
+        result records. The gap is measured against optimum[instance] when
+        known, otherwise against the best cost any run found on the instance """
+    optimum = optimum or {}
+    records = []
+    for name, costGraph in instances:
+        pending = []
+        for engine in engines:
+            engineParams = dict(params, **ENGINES[engine])
+            if engine != "workers":
+                engineParams.pop("workers", None)
+            for variant in variants:
+                runs = [Run(variant, costGraph, seed, engineParams) for seed in seeds]
+                record = {"variant": variant, "instance": name, "n": len(costGraph), "engine": engine,
+                          "population": Population(variant, engineParams), "seeds": list(seeds),
+                          "params": {k: v for k, v in engineParams.items() if k != "dtype"},
+                          "peak_memory_mb": PeakMemory(variant, costGraph, seeds[0], engineParams)
+                          if memory else None}
+                pending.append((record, runs))
+                print("%-5s %-14s %-7s %10.2f it/s  best %.4f" % (variant, name, engine,
+                      np.mean([run["iterations_per_sec"] for run in runs]), min(run["best"] for run in runs)),
+                      file = sys.stderr)
+        reference = optimum.get(name, min(run["best"] for record, runs in pending for run in runs))
+        records.extend(Summarize(record, runs, reference, gap) for record, runs in pending)
+    return records
+
+#------------------------------------BASELINE COMPARISON-------------------------------------------------
+
+def Key(record):
+    return (record["variant"], record["instance"], record["engine"], record["population"],
+            json.dumps(record["params"], sort_keys = True))
+
+def Compare(records, baseline, tolerance = 0.1):
+    """ matches the records against the baseline records and returns one row per
+        match with the speed and cost ratios (new/old) and whether it regressed """
+    old = {Key(record): record for record in baseline}
+    rows = []
+    for record in records:
+        base = old.get(Key(record))
+        if base is None:
+            continue
+        speed = record["iterations_per_sec"]/base["iterations_per_sec"]
+        cost = record["mean_cost"]/base["mean_cost"]
+        rows.append({"variant": record["variant"], "instance": record["instance"], "engine": record["engine"],
+                     "speed_ratio": speed, "cost_ratio": cost,
+                     "regression": speed < 1 - tolerance or cost > 1 + tolerance})
+    return rows
+
+def Table(records, comparison = ()):
+    """ human readable summary of the records (and of the baseline comparison) """
+    lines = ["%-5s %-14s %6s %-7s %10s %10s %10s %10s %12s %12s" % ("algo", "instance", "n", "engine", "it/s",
+             "ants/s", "target s", "peak MB", "best", "mean")]
+    for r in records:
+        lines.append("%-5s %-14s %6d %-7s %10.2f %10.1f %10s %10s %12.4f %12.4f" % (
+            r["variant"], r["instance"], r["n"], r["engine"], r["iterations_per_sec"], r["ants_per_sec"],
+            "-" if r["time_to_target"] is None else "%.3f" % r["time_to_target"],
+            "-" if r["peak_memory_mb"] is None else "%.1f" % r["peak_memory_mb"], r["best_cost"], r["mean_cost"]))
+    if comparison:
+        lines.append("")
+        lines.append("%-5s %-14s %-7s %10s %10s" % ("algo", "instance", "engine", "speed x", "cost x"))
+        for row in comparison:
+            lines.append("%-5s %-14s %-7s %10.3f %10.4f%s" % (row["variant"], row["instance"], row["engine"],
+                         row["speed_ratio"], row["cost_ratio"], "  REGRESSION" if row["regression"] else ""))
+    return "\n".join(lines)
+
+#------------------------------------COMMAND LINE--------------------------------------------------------
+
+def Optimum(values):
+    """ "name=cost" pairs to a dict """
+    return {name: float(cost) for name, cost in (value.split("=", 1) for value in values)}
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Benchmark the ant system variants")
+    parser.add_argument("--variants", nargs = "+", default = list(VARIANTS), choices = list(VARIANTS))
+    parser.add_argument("--sizes", nargs = "*", type = int, default = [20, 100, 500],
+                        help = "random graph sizes (RTSP.RandGraph), 20 to 5000 cities")
+    parser.add_argument("--files", nargs = "*", default = [], help = "coordinate or TSPLIB files (RouteMatrix.TSRM)")
+    parser.add_argument("--graph-seed", type = int, default = 0, help = "seed of the random graphs")
+    parser.add_argument("--seeds", nargs = "+", type = int, default = [0, 1, 2], help = "solver seeds")
+    parser.add_argument("--iterations", type = int, default = 50)
+    parser.add_argument("--population", type = int, default = None, help = "ants (default: the variant's)")
+    parser.add_argument("--engines", nargs = "+", default = ["batch"], choices = list(ENGINES))
+    parser.add_argument("--workers", type = int, default = 2, help = "pool size of the workers engine")
+    parser.add_argument("--candidates", type = int, default = None)
+    parser.add_argument("--local-search", default = None, choices = ["all", "ibest", "bsf"])
+    parser.add_argument("--target-gap", type = float, default = 0.05)
+    parser.add_argument("--optimum", nargs = "*", default = [], help = "known optima as instance=cost")
+    parser.add_argument("--no-memory", action = "store_true", help = "skip the peak memory runs")
+    parser.add_argument("--output", default = "benchmark.json")
+    parser.add_argument("--baseline", default = None, help = "JSON of an earlier run to compare against")
+    parser.add_argument("--tolerance", type = float, default = 0.1, help = "allowed slowdown / cost increase")
+    args = parser.parse_args(argv)
+
+    params = {"iterations": args.iterations, "candidates": args.candidates, "local_search": args.local_search,
+              "workers": args.workers}
+    if args.population is not None:
+        params["Population"] = args.population
+    records = Benchmark(args.variants, Instances(args.sizes, args.files, args.graph_seed), args.seeds,
+                        args.engines, args.target_gap, Optimum(args.optimum), not args.no_memory, **params)
+
+    comparison = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            comparison = Compare(records, json.load(f)["results"], args.tolerance)
+    report = {"meta": {"python": platform.python_version(), "numpy": np.__version__,
+                       "platform": platform.platform(), "cpus": os.cpu_count(),
+                       "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "args": vars(args)},
+              "results": records, "comparison": comparison}
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent = 1)
+    print(Table(records, comparison))
+    return 1 if any(row["regression"] for row in comparison) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+# Checkpoint / resume of the solvers. A checkpoint is a directory holding the
+# pheromone matrix as a memory mapped .npy and the rest of the state pickled:
+# BSF/IBEST, iteration, RNG states, stopping rule progress and the variant's
+# own variables (tmax/tmin and stagnation counter of MMAS, t0 of ACS, ...)
+import os
+import glob
+import time
+import pickle
+import random
+import numpy as np
+
+def State(iteration, PRM, BSF, IBEST, rng, budget, colony = None, **variables):
+    """ the solver state after iteration: enough to continue the run as if it never stopped """
+    return {"iteration": iteration, "PRM": PRM, "BSF": BSF, "IBEST": IBEST,
+            "rng": rng.bit_generator.state, "random": random.getstate(),
+            "budget": (budget.best, budget.stale),
+            "colony": None if colony is None else (colony.seeds.entropy, colony.seeds.n_children_spawned),
+            "variables": variables}
+
+def Restore(state, PRM, rng, budget, colony = None):
+    """ puts state (a State dict or a checkpoint directory) back into the solver's
+        PRM, rng, budget and colony. Returns iteration, BSF, IBEST and the variables """
+    if isinstance(state, (str, os.PathLike)):
+        state = Load(state)
+    np.copyto(PRM, state["PRM"])
+    rng.bit_generator.state = state["rng"]
+    random.setstate(state["random"])
+    budget.best, budget.stale = state["budget"]
+    if colony is not None and state["colony"] is not None:
+        entropy, spawned = state["colony"]
+        colony.seeds = np.random.SeedSequence(entropy, n_children_spawned = spawned)
+    return state["iteration"], state["BSF"], state["IBEST"], state["variables"]
+
+def Save(directory, state):
+    """ writes state to directory. The pheromones go to a fresh memory mapped
+        file (the copy lands in the page cache, the kernel writes it back in
+        the background), then the pickled state naming that file replaces the
+        old one, so an interrupted save leaves the previous checkpoint intact """
+    os.makedirs(directory, exist_ok = True)
+    PRM = np.asarray(state["PRM"])
+    name = "PRM-%d.npy" % state["iteration"]
+    out = np.lib.format.open_memmap(os.path.join(directory, name + ".tmp"), mode = "w+",
+                                    dtype = PRM.dtype, shape = PRM.shape)
+    out[:] = PRM
+    del out
+    os.replace(os.path.join(directory, name + ".tmp"), os.path.join(directory, name))
+    with open(os.path.join(directory, "state.pkl.tmp"), "wb") as f:
+        pickle.dump(dict(state, PRM = name), f)
+    os.replace(os.path.join(directory, "state.pkl.tmp"), os.path.join(directory, "state.pkl"))
+    for old in glob.glob(os.path.join(directory, "PRM-*.npy")):
+        if os.path.basename(old) != name:
+            os.remove(old)
+
+def Load(directory):
+    """ reads the state saved in directory, the pheromones memory mapped read only """
+    with open(os.path.join(directory, "state.pkl"), "rb") as f:
+        state = pickle.load(f)
+    state["PRM"] = np.load(os.path.join(directory, state["PRM"]), mmap_mode = "r")
+    return state
+
+class Checkpointer:
+    """ saves to directory every `every` iterations and/or every `seconds` seconds """
+
+    def __init__(self, directory, every = None, seconds = None):
+        self.directory = directory
+        self.every = every
+        self.seconds = seconds
+        self.last = time.perf_counter()
+
+    def Due(self, iteration):
+        if self.every is not None and iteration % self.every == 0:
+            return True
+        return self.seconds is not None and time.perf_counter() - self.last >= self.seconds
+
+    def Save(self, state):
+        Save(self.directory, state)
+        self.last = time.perf_counter()
@@ -0,0 +1,194 @@
+# Construction heuristics: quick tours whose cost sets the initial pheromone levels
+# (tau0 of AS/EAS/RBAS, t0 of ACS, tmax of MMAS) and the initial BSF of the solvers.
+# Rows of the cost matrix are used whole, so RouteMatrix.Implicit costs work as well.
+import numpy as np
+import Engine
+import Tours
+
+KINDS = ("nn", "greedy", "sfc", "christofides")
+
+def NearestNeighbour(cost, start = 0):
+    """ nearest neighbour tour from start, one masked argmin per step: O(n^2) """
+    n = len(cost)
+    visited = np.zeros(n, dtype = bool)
+    route = np.empty(n + 1, dtype = np.int64)
+    node = start
+    for k in range(n):
+        route[k] = node
+        visited[node] = True
+        if k < n - 1:
+            node = Engine.Fallback(cost, visited, node)
+    route[n] = start
+    return route
+
+def Fragments(neighbours, degree):
+    """ the paths of a graph of degree <= 2 without cycles, as node lists """
+    n = len(degree)
+    seen = np.zeros(n, dtype = bool)
+    paths = []
+    for end in np.flatnonzero(degree < 2):
+        if seen[end]:
+            continue
+        path, previous, node = [int(end)], -1, int(end)
+        seen[end] = True
+        while True:
+            nxt = [m for m in neighbours[node] if m != previous and not seen[m]]
+            if not nxt:
+                break
+            previous, node = node, nxt[0]
+            seen[node] = True
+            path.append(node)
+        paths.append(path)
+    return paths
+
+def Join(cost, paths):
+    """ chains the paths into a tour, always moving on to the
+        path whose nearest end is closest to the current tail """
+    tour = list(paths[0])
+    rest = paths[1:]
+    while rest:
+        firsts = np.array([path[0] for path in rest])
+        lasts = np.array([path[-1] for path in rest])
+        d = np.concatenate((cost[tour[-1], firsts], cost[tour[-1], lasts]))
+        k = int(np.argmin(d))
+        path = rest.pop(k % len(firsts))
+        tour.extend(path if k < len(firsts) else path[::-1])
+    return np.array(tour + tour[:1], dtype = np.int64)
+
+def GreedyEdge(cost, k = 10):
+    """ greedy matching: the cheapest k nearest neighbour arcs are added while
+        no node gets degree 3 and no cycle closes (union find), then the
+        fragments are chained. O(n k log(n k)) plus the chaining """
+    n = len(cost)
+    cand = Engine.Candidates(cost, k)
+    i = np.repeat(np.arange(n), cand.shape[1])
+    j = cand.ravel()
+    a, b = np.minimum(i, j), np.maximum(i, j)
+    keys = np.unique(a*n + b)
+    a, b = keys // n, keys % n
+    order = np.argsort(np.asarray(cost[a, b]), kind = "stable")
+    parent = list(range(n))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    degree = np.zeros(n, dtype = np.int64)
+    neighbours = [[] for node in range(n)]
+    for u, v in zip(a[order].tolist(), b[order].tolist()):
+        if degree[u] < 2 and degree[v] < 2:
+            ru, rv = find(u), find(v)
+            if ru != rv:
+                parent[ru] = rv
+                degree[u] += 1
+                degree[v] += 1
+                neighbours[u].append(v)
+                neighbours[v].append(u)
+    return Join(cost, Fragments(neighbours, degree))
+
+def HilbertIndex(coords, order = 16):
+    """ position of every point along a Hilbert curve over its bounding box """
+    xy = np.asarray(coords, dtype = float)
+    xy = xy - xy.min(axis = 0)
+    side = 2**order
+    x, y = (xy*((side - 1)/max(xy.max(), 1e-300))).astype(np.int64).T
+    d = np.zeros(len(xy), dtype = np.int64)
+    s = side // 2
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        d += s*s*((3*rx) ^ ry)
+        flip = ~ry & rx
+        x, y = np.where(flip, side - 1 - x, x), np.where(flip, side - 1 - y, y)
+        x, y = np.where(ry, x, y), np.where(ry, y, x)
+        s //= 2
+    return d
+
+def SpaceFillingCurve(coords):
+    """ cities in the order of a Hilbert curve: O(n log n), needs the coordinates """
+    route = np.argsort(HilbertIndex(coords), kind = "stable")
+    return np.append(route, route[0])
+
+def SpanningTree(cost):
+    """ minimum spanning tree (Prim, one row per step: O(n^2)) as (parent, child) arrays """
+    n = len(cost)
+    inTree = np.zeros(n, dtype = bool)
+    best = np.full(n, np.inf)
+    parent = np.full(n, -1, dtype = np.int64)
+    node = 0
+    children = []
+    for step in range(n - 1):
+        inTree[node] = True
+        row = np.asarray(cost[node], dtype = float)
+        better = ~inTree & (row < best)
+        best[better] = row[better]
+        parent[better] = node
+        node = int(np.argmin(np.where(inTree, np.inf, best)))
+        children.append(node)
+    children = np.array(children, dtype = np.int64)
+    return parent[children], children
+
+def Christofides(cost):
+    """ Christofides style tour: minimum spanning tree plus a greedy (nearest
+        unmatched) matching of its odd degree nodes, whose Euler circuit is
+        shortcut to a tour. The matching is not the minimum one, so the 1.5
+        bound does not hold, but the tour is as good in practice. O(n^2) """
+    n = len(cost)
+    parents, children = SpanningTree(cost)
+    edges = list(zip(parents.tolist(), children.tolist()))
+    odd = np.flatnonzero(np.bincount(np.concatenate((parents, children)), minlength = n) % 2)
+    matched = np.zeros(len(odd), dtype = bool)
+    for k in range(len(odd)):
+        if matched[k]:
+            continue
+        matched[k] = True
+        d = np.where(matched, np.inf, np.asarray(cost[odd[k], odd], dtype = float))
+        m = int(np.argmin(d))
+        matched[m] = True
+        edges.append((int(odd[k]), int(odd[m])))
+    #-----------------EULER CIRCUIT (Hierholzer) and SHORTCUT---------------------------------
+    adjacency = [[] for node in range(n)]
+    for e, (u, v) in enumerate(edges):
+        adjacency[u].append((v, e))
+        adjacency[v].append((u, e))
+    used = np.zeros(len(edges), dtype = bool)
+    stack, circuit = [0], []
+    while stack:
+        node = stack[-1]
+        while adjacency[node] and used[adjacency[node][-1][1]]:
+            adjacency[node].pop()
+        if adjacency[node]:
+            nxt, e = adjacency[node].pop()
+            used[e] = True
+            stack.append(nxt)
+        else:
+            circuit.append(stack.pop())
+    seen = np.zeros(n, dtype = bool)
+    route = []
+    for node in circuit:
+        if not seen[node]:
+            seen[node] = True
+            route.append(node)
+    return np.array(route + route[:1], dtype = np.int64)
+
+def Tour(costGraph, kind = "nn", coords = None):
+    """ takes a costgraph and a construction heuristic ("nn", "greedy", "sfc"
+        or "christofides") and returns its tour as a Tours.Tour. "sfc" needs
+        coords, taken from a RouteMatrix.Implicit cost when not given """
+    cost = Engine.Costs(costGraph)
+    if kind == "nn":
+        route = NearestNeighbour(cost)
+    elif kind == "greedy":
+        route = GreedyEdge(cost)
+    elif kind == "sfc":
+        coords = getattr(cost, "coords", None) if coords is None else coords
+        if coords is None:
+            raise ValueError("the space filling curve needs coordinates (pass coords or a RouteMatrix.Implicit)")
+        route = SpaceFillingCurve(coords)
+    elif kind == "christofides":
+        route = Christofides(cost)
+    else:
+        raise ValueError("construction must be one of " + ", ".join(KINDS))
+    return Tours.Tour(route, costGraph = cost)
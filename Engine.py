@@ -0,0 +1,325 @@
+# Array backed tour construction shared by AS, EAS, RBAS, MMAS and ACS
+import random
+import numpy as np
+import Pheromone
+import Kernels
+
+def Generator(rng = None):
+    """ returns rng, or when None a numpy Generator seeded from the
+        global random module, so random.seed() reproduces the tours """
+    return np.random.default_rng(random.getrandbits(64)) if rng is None else rng
+
+def Costs(costGraph, dtype = np.float64):
+    """ returns costGraph as an ndarray, or unchanged when it computes
+        its costs on demand (RouteMatrix.Implicit) """
+    if hasattr(costGraph, "Nearest"):
+        return costGraph
+    return np.asarray(costGraph, dtype = dtype)
+
+def Heuristic(costGraph, dtype = np.float64, cand = None):
+    """ takes a costgraph and returns the
+        inverse cost (eta) matrix with a zero diagonal.
+        With a candidate list only the (n, k) candidate arcs are computed """
+    if cand is None:
+        cost = np.asarray(costGraph, dtype = dtype)
+    else:
+        cost = np.asarray(Costs(costGraph)[np.arange(len(cand))[:, None], cand], dtype = dtype)
+    with np.errstate(divide = "ignore"):
+        eta = 1/cost
+    if cand is None:
+        np.fill_diagonal(eta, 0)
+    return eta
+
+def Candidates(costGraph, k = None):
+    """ takes a costgraph and returns the k nearest neighbours of every
+        node as an (n, k) int array sorted by cost. k may also be an
+        index returned by an earlier call, which is reused as is """
+    if np.ndim(k) == 2:
+        return np.asarray(k)
+    if hasattr(costGraph, "Nearest"):
+        # on demand costs always construct from candidate lists
+        return costGraph.Nearest(20 if k is None else k)
+    if k is None:
+        return None
+    cost = np.array(costGraph, dtype = float)
+    np.fill_diagonal(cost, np.inf)
+    k = min(int(k), len(cost) - 1)
+    nearest = np.argpartition(cost, k - 1, axis = 1)[:, :k]
+    order = np.argsort(np.take_along_axis(cost, nearest, axis = 1), axis = 1)
+    return np.take_along_axis(nearest, order, axis = 1)
+
+def ChoiceMatrix(pheromoneGraph, eta, alpha = 1, beta = 3):
+    """ takes a pheromone graph and an eta matrix (both n x n, or both
+        (n, k) over the candidate arcs) and returns the tau**alpha * eta**beta matrix.
+        A packed pheromone store is raised to alpha before it is expanded """
+    tau = np.asarray(pheromoneGraph)
+    tau = tau if tau.dtype.kind == "f" else tau.astype(float)
+    return Pheromone.Dense(tau**alpha) * eta**beta
+
+def Masked(choice, visited, node, cand = None):
+    """ returns the weights leaving node with the visited nodes zeroed
+        and the matching visited mask (over the candidates of node
+        when a candidate list is given) """
+    if cand is None:
+        weights = choice[node].copy()
+        weights[visited] = 0
+        return weights, visited
+    blocked = visited[cand[node]]
+    return np.where(blocked, 0, choice[node]), blocked
+
+def Fallback(cost, visited, node):
+    """ nearest unvisited node, used once every candidate of node is taken """
+    return int(np.argmin(np.where(visited, np.inf, cost[node])))
+
+def Dropout(weights, visited, rng, p = 0.01):
+    """ zeroes the weights of a random subset of the unvisited nodes.
+        Every unvisited node triggers one removal with probability p
+        and at least one node is always kept, as in ACOAs.Travel """
+    available = np.flatnonzero(~visited)
+    k = min(rng.binomial(len(available), p), len(available) - 1)
+    if k > 0:
+        weights[rng.choice(available, k, replace = False)] = 0
+    return weights
+
+def Uniform(visited, rng):
+    """ an unvisited node drawn uniformly from a single rng.random() """
+    available = np.flatnonzero(~visited)
+    return int(available[int(rng.random()*len(available))])
+
+def Roulette(weights, visited, rng):
+    """ draws one node with probability proportional to its
+        weight using a single cumulative sum and searchsorted """
+    cumulative = np.cumsum(weights)
+    total = cumulative[-1]
+    if not total > 0:
+        # every weight underflowed, fall back to a uniform choice
+        return Uniform(visited, rng)
+    return int(np.searchsorted(cumulative, rng.random()*total, side = "right"))
+
+def Greedy(weights, visited, rng):
+    """ returns the node with the largest weight """
+    if not weights.max() > 0:
+        return Uniform(visited, rng)
+    return int(np.argmax(weights))
+
+def Step(choice, visited, node, rng, dropout = False, p = 0.01, exploit = False, cand = None, cost = None):
+    """ one construction step of an ant standing on node """
+    weights, blocked = Masked(choice, visited, node, cand)
+    if cand is not None and blocked.all():
+        return Fallback(cost, visited, node)
+    if dropout:
+        weights = Dropout(weights, blocked, rng, p)
+    pick = Greedy(weights, blocked, rng) if exploit else Roulette(weights, blocked, rng)
+    return pick if cand is None else int(cand[node][pick])
+
+def ArrayTravel(choice, rng = None, dropout = False, start = None, p = 0.01, cand = None, cost = None):
+    """ takes a choice matrix (tau**alpha * eta**beta) and returns
+        a hamiltonian circle route as an int array of length n+1.
+        With a candidate list choice is the (n, k) candidate matrix and
+        cost picks the fallback node """
+    rng = Generator(rng)
+    if Kernels.Active(dropout, cand):
+        return Kernels.Travel(choice, rng, start)
+    n = len(choice)
+    route = np.empty(n + 1, dtype = np.int64)
+    visited = np.zeros(n, dtype = bool)
+    node = rng.integers(n) if start is None else start
+    route[0] = node
+    visited[node] = True
+
+    # make sequencial choices
+    for step in range(1, n):
+        node = Step(choice, visited, node, rng, dropout and n - step > 1, p, False, cand, cost)
+        route[step] = node
+        visited[node] = True
+
+    route[n] = route[0]
+    return route
+
+def LocalUpdate(pheromoneGraph, choice, greedy, etaB, start, end, t0, eps = 0.1, alpha = 1, cand = None,
+                symmetric = True):
+    """ ACS local pheromone update on the arc (start, end) that also
+        refreshes the matching entries of the choice and greedy matrices.
+        With a candidate list only candidate arcs carry pheromone. A packed
+        store holds one value for both directions, a directed update
+        (symmetric False) leaves (end, start) alone """
+    if np.ndim(pheromoneGraph) == 1:
+        k = Pheromone.Triangle(start, end, len(choice))
+        pheromoneGraph[k] = (1-eps)*pheromoneGraph[k] + eps*t0
+        for i, j in ((start, end), (end, start)):
+            greedy[i, j] = pheromoneGraph[k]*etaB[i, j]
+            choice[i, j] = pheromoneGraph[k]**alpha*etaB[i, j]
+        return
+    for i, j in ((start, end), (end, start)) if symmetric else ((start, end),):
+        if cand is not None:
+            k = np.flatnonzero(cand[i] == j)
+            if not k.size:
+                continue
+            j = k[0]
+        pheromoneGraph[i][j] = (1-eps)*pheromoneGraph[i][j] + eps*t0
+        greedy[i, j] = pheromoneGraph[i][j]*etaB[i, j]
+        choice[i, j] = pheromoneGraph[i][j]**alpha*etaB[i, j]
+
+def ArrayACSTravel(choice, greedy, pheromoneGraph, etaB, t0, eps = 0.1, q0 = 0.9, alpha = 1,
+                   rng = None, dropout = False, start = None, cand = None, cost = None, symmetric = True):
+    """ takes the roulette choice matrix (tau**alpha * eta**beta), the greedy
+        matrix (tau * eta**beta), the pheromone graph and eta**beta and returns
+        a hamiltonian circle route. The local pheromone update is applied in
+        place to pheromoneGraph, choice and greedy """
+    rng = Generator(rng)
+    if Kernels.Active(dropout, cand):
+        return Kernels.ACSTravel(choice, greedy, pheromoneGraph, etaB, t0, eps, q0, alpha, rng, start, symmetric)
+    n = len(choice)
+    route = np.empty(n + 1, dtype = np.int64)
+    visited = np.zeros(n, dtype = bool)
+    node = rng.integers(n) if start is None else start
+    route[0] = node
+    visited[node] = True
+
+    # make sequencial choices
+    for step in range(1, n):
+        #------------------CHOOSE NODE--------------------------------------------------------------
+        exploit = rng.random() < q0
+        nextNode = Step(greedy if exploit else choice, visited, node, rng, dropout and n - step > 1,
+                        0.005, exploit, cand, cost)
+        #----------------LOCAL PHEROMONE UPDATE-----------------------------------------------------
+        LocalUpdate(pheromoneGraph, choice, greedy, etaB, node, nextNode, t0, eps, alpha, cand, symmetric)
+
+        node = nextNode
+        route[step] = node
+        visited[node] = True
+
+    route[n] = route[0]
+    return route
+
+#------------------------------BATCHED COLONY CONSTRUCTION---------------------------------------
+
+def BatchRoulette(weights, visited, rng):
+    """ row wise roulette: draws one node per ant (row) with
+        probability proportional to the row weights """
+    cumulative = np.cumsum(weights, axis = 1)
+    total = cumulative[:, -1]
+    nodes = (cumulative <= (rng.random(len(weights))*total)[:, None]).sum(axis = 1)
+    for ant in np.flatnonzero(~(total > 0)):
+        available = np.flatnonzero(~visited[ant])
+        nodes[ant] = rng.choice(available) if available.size else 0
+    return nodes
+
+def BatchGreedy(weights, visited, rng):
+    """ row wise arg max of the weights """
+    nodes = np.argmax(weights, axis = 1)
+    for ant in np.flatnonzero(~(weights.max(axis = 1) > 0)):
+        available = np.flatnonzero(~visited[ant])
+        nodes[ant] = rng.choice(available) if available.size else 0
+    return nodes
+
+def BatchDropout(weights, visited, rng, p = 0.01):
+    """ Dropout applied to every ant (row) """
+    remaining = (~visited).sum(axis = 1)
+    drops = np.minimum(rng.binomial(remaining, p), np.maximum(remaining - 1, 0))
+    for ant in np.flatnonzero(drops > 0):
+        weights[ant, rng.choice(np.flatnonzero(~visited[ant]), drops[ant], replace = False)] = 0
+    return weights
+
+def BatchMasked(choice, visited, nodes, cand = None):
+    """ Masked for every ant (row) at once """
+    if cand is None:
+        weights = choice[nodes]
+        weights[visited] = 0
+        return weights, visited
+    blocked = visited[np.arange(len(nodes))[:, None], cand[nodes]]
+    return np.where(blocked, 0, choice[nodes]), blocked
+
+def BatchStep(choice, visited, nodes, rng, dropout = False, p = 0.01, exploit = None, cand = None, cost = None,
+              greedy = None):
+    """ one construction step of the whole colony. exploit is a per ant
+        mask selecting the greedy matrix instead of the roulette """
+    weights, blocked = BatchMasked(choice, visited, nodes, cand)
+    if exploit is not None:
+        weights = np.where(exploit[:, None], BatchMasked(greedy, visited, nodes, cand)[0], weights)
+    if dropout:
+        weights = BatchDropout(weights, blocked, rng, p)
+    picks = BatchRoulette(weights, blocked, rng)
+    if exploit is not None:
+        picks = np.where(exploit, BatchGreedy(weights, blocked, rng), picks)
+    if cand is None:
+        return picks
+    nextNodes = cand[nodes, picks]
+    for ant in np.flatnonzero(blocked.all(axis = 1)):
+        nextNodes[ant] = Fallback(cost, visited[ant], nodes[ant])
+    return nextNodes
+
+def BatchTravel(choice, Population, rng = None, dropout = False, p = 0.01, cand = None, cost = None):
+    """ takes a choice matrix and builds the tours of the whole colony
+        together. Returns a (Population, n+1) int array of routes """
+    rng = Generator(rng)
+    n = len(choice)
+    ants = np.arange(Population)
+    routes = np.empty((Population, n + 1), dtype = np.int64)
+    visited = np.zeros((Population, n), dtype = bool)
+    nodes = rng.integers(n, size = Population)
+    routes[:, 0] = nodes
+    visited[ants, nodes] = True
+
+    for step in range(1, n):
+        nodes = BatchStep(choice, visited, nodes, rng, dropout and n - step > 1, p, None, cand, cost)
+        routes[:, step] = nodes
+        visited[ants, nodes] = True
+
+    routes[:, n] = routes[:, 0]
+    return routes
+
+def BatchLocalUpdate(pheromoneGraph, choice, greedy, etaB, starts, ends, t0, eps = 0.1, alpha = 1, cand = None,
+                     symmetric = True):
+    """ LocalUpdate for one step of the whole colony. An arc used by c ants
+        in the same step is decayed c times, as if the ants moved in turn """
+    n = len(choice)
+    arcs = np.concatenate([starts*n + ends, ends*n + starts]) if symmetric else starts*n + ends
+    arcs, count = np.unique(arcs, return_counts = True)
+    i, j = arcs // n, arcs % n
+    if np.ndim(pheromoneGraph) == 1:
+        # one packed value per pair: decay it once, refresh both directions of choice and greedy
+        upper = i < j
+        i, j, count = i[upper], j[upper], count[upper]
+        (k,), found = Pheromone.Key(pheromoneGraph, i, j)
+        pheromoneGraph[k] = t0 + (pheromoneGraph[k] - t0)*(1-eps)**count
+        for a, b in ((i, j), (j, i)):
+            greedy[a, b] = pheromoneGraph[k]*etaB[a, b]
+            choice[a, b] = pheromoneGraph[k]**alpha*etaB[a, b]
+        return
+    i, j, found = Pheromone.Index(i, j, cand)
+    pheromoneGraph[i, j] = t0 + (pheromoneGraph[i, j] - t0)*(1-eps)**count[found]
+    greedy[i, j] = pheromoneGraph[i, j]*etaB[i, j]
+    choice[i, j] = pheromoneGraph[i, j]**alpha*etaB[i, j]
+
+def BatchACSTravel(choice, greedy, pheromoneGraph, etaB, t0, Population, eps = 0.1, q0 = 0.9, alpha = 1,
+                   rng = None, dropout = False, cand = None, cost = None, symmetric = True):
+    """ ArrayACSTravel for the whole colony at once: every step makes the
+        q0 greedy or roulette choice for all ants and then applies the
+        local pheromone update for the arcs they just used """
+    rng = Generator(rng)
+    n = len(choice)
+    ants = np.arange(Population)
+    routes = np.empty((Population, n + 1), dtype = np.int64)
+    visited = np.zeros((Population, n), dtype = bool)
+    nodes = rng.integers(n, size = Population)
+    routes[:, 0] = nodes
+    visited[ants, nodes] = True
+
+    for step in range(1, n):
+        exploit = rng.random(Population) < q0
+        nextNodes = BatchStep(choice, visited, nodes, rng, dropout and n - step > 1, 0.005, exploit, cand, cost,
+                              greedy)
+        BatchLocalUpdate(pheromoneGraph, choice, greedy, etaB, nodes, nextNodes, t0, eps, alpha, cand, symmetric)
+
+        nodes = nextNodes
+        routes[:, step] = nodes
+        visited[ants, nodes] = True
+
+    routes[:, n] = routes[:, 0]
+    return routes
+
+def TourCosts(cost, routes):
+    """ takes a cost matrix (or RouteMatrix.Implicit) and a
+        (Population, n+1) route array and returns the cost of every route """
+    return cost[routes[:, :-1], routes[:, 1:]].sum(axis = 1)
@@ -0,0 +1,113 @@
+# Island model: independent colonies in separate processes that exchange
+# their best so far tours every K iterations over a ring or broadcast topology
+import queue
+import pickle
+import random
+import multiprocessing
+import numpy as np
+import ACOAs
+
+POLL = 1.0      # seconds between checks that no island died without a result
+DONE = "done"   # posted to the inboxes of its targets by an island that has stopped
+VARIANTS = {"AS": ACOAs.AS, "EAS": ACOAs.EAS, "RBAS": ACOAs.RBAS, "ACS": ACOAs.ACS, "MMAS": ACOAs.MMAS}
+
+def Targets(index, islands, topology = "ring"):
+    """ islands that receive the BSF of island index """
+    if topology == "ring":
+        return [(index + 1) % islands]
+    if topology == "broadcast":
+        return [i for i in range(islands) if i != index]
+    raise ValueError("unknown topology " + repr(topology))
+
+def Exchange(index, inboxes, topology = "ring", K = 10, timeout = 60):
+    """ returns the exchange callback of island index: every K iterations it
+        sends the island's BSF to its targets and returns the best tour
+        received from the other islands (or None). An island that has
+        stopped posts DONE instead, and is no longer waited for """
+    targets = Targets(index, len(inboxes), topology)
+    expected = sum(index in Targets(i, len(inboxes), topology) for i in range(len(inboxes)))
+
+    def exchange(iteration, best):
+        nonlocal expected
+        if iteration % K:
+            return None
+        for target in targets:
+            inboxes[target].put(best)
+        incoming = []
+        while len(incoming) < expected:
+            try:
+                tour = inboxes[index].get(timeout = timeout)
+            except queue.Empty:
+                break
+            if tour == DONE:
+                expected -= 1
+            else:
+                incoming.append(tour)
+        return min(incoming, key = lambda tour: tour["Cost"], default = None)
+    return exchange
+
+def Island(index, variant, costGraph, inboxes, results, topology, K, timeout, seed, params):
+    """ runs one colony and puts (index, result) on the results queue, or
+        (index, exception) when the colony raised """
+    random.seed(seed)
+    solver = VARIANTS[variant]
+    try:
+        result = solver(costGraph, seed = seed, exchange = Exchange(index, inboxes, topology, K, timeout), **params)
+    except Exception as exception:
+        try:
+            pickle.dumps(exception)
+            result = exception
+        except Exception:
+            result = RuntimeError(repr(exception))
+    finally:
+        # stopped early (time_limit, target, patience) or failed: the other islands stop waiting for us
+        for target in Targets(index, len(inboxes), topology):
+            inboxes[target].put(DONE)
+    results.put((index, result))
+    for inbox in inboxes:
+        # tours left over after the last migration must not block the exit
+        inbox.cancel_join_thread()
+
+def Islands(costGraph, variant = "MMAS", islands = 4, K = 10, topology = "ring", seed = None, timeout = 60,
+            **params):
+    """ takes a costgraph, the ACO variant to run ("AS", "EAS", "RBAS", "ACS" or "MMAS")
+        and the number of islands and returns the result of every island and the
+        global best. params are passed on to the variant (Population, iterations, ...).
+        An exception raised by an island is raised here, and RuntimeError when an
+        island process dies without a result (killed, out of memory, ...) """
+    seeds = np.random.SeedSequence(seed).generate_state(islands)
+    inboxes = [multiprocessing.Queue() for i in range(islands)]
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target = Island,
+                                         args = (i, variant, costGraph, inboxes, results, topology, K, timeout,
+                                                 int(seeds[i]), params))
+                 for i in range(islands)]
+    for process in processes:
+        process.start()
+    Results = {}
+    try:
+        while len(Results) < islands:
+            try:
+                index, result = results.get(timeout = POLL)
+            except queue.Empty:
+                dead = [i for i in range(islands) if i not in Results and processes[i].exitcode is not None]
+                if not dead:
+                    continue
+                try:
+                    # a result put just before the exit can still be in the pipe
+                    index, result = results.get(timeout = POLL)
+                except queue.Empty:
+                    raise RuntimeError("island %d exited with code %s without a result"
+                                       % (dead[0], processes[dead[0]].exitcode)) from None
+            if isinstance(result, Exception):
+                raise result
+            Results[index] = result
+    finally:
+        for process in processes:
+            if len(Results) < islands:
+                process.terminate()
+            process.join()
+
+    Results = [Results[i] for i in range(islands)]
+    best = min(range(islands), key = lambda i: Results[i]["BSF"])
+    return {"Islands": Results, "BSF": Results[best]["BSF"], "Route": Results[best]["Route"], "Island": best}
@@ -0,0 +1,350 @@
+# Pluggable kernels for the parts of the solvers that are sequential by nature: the
+# step by step roulette / greedy tour construction (NextNode, PseudoNextNode), the
+# ACS local update made during construction and the MMAS deposit/evaporation clamps.
+# Backends: "numba" (the kernels below compiled, when numba is installed), "python"
+# (the same kernels uncompiled, a reference) and "numpy" (the Engine/Pheromone array
+# code). Pick one with Select(name) or the ACO_BACKEND environment variable.
+# The kernels draw their random numbers from the caller's numpy Generator exactly
+# as the numpy path does, so every backend gives the same tours for the same seed.
+import os
+import types
+import numpy as np
+import Pheromone
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+BACKENDS = ("numpy", "python", "numba")
+
+#------------------------------------KERNELS (numba compatible python)-----------------------------------
+
+def Uniform(visited, r):
+    """ the unvisited node picked by the uniform r, as Engine.Uniform """
+    left = 0
+    for j in range(visited.shape[0]):
+        if not visited[j]:
+            left += 1
+    k = int(r*left)
+    for j in range(visited.shape[0]):
+        if not visited[j]:
+            if k == 0:
+                return j
+            k -= 1
+    return -1
+
+def Pick(weights, visited, node, r, greedy):
+    """ the next node from the row weights[node] without the visited nodes:
+        roulette with the uniform r (Engine.Roulette), or the first largest
+        weight when greedy (Engine.Greedy, -1 when every weight is zero) """
+    n = weights.shape[1]
+    total = 0.0
+    best, pick = 0.0, -1
+    for j in range(n):
+        if not visited[j]:
+            total += weights[node, j]
+            if weights[node, j] > best:
+                best, pick = weights[node, j], j
+    if greedy:
+        return pick
+    if not total > 0:
+        return Uniform(visited, r)
+    target = r*total
+    cumulative = 0.0
+    for j in range(n):
+        if not visited[j]:
+            cumulative += weights[node, j]
+        if cumulative > target:
+            return j
+    return n
+
+def TravelKernel(choice, start, uniforms):
+    """ ArrayTravel: one uniform per step """
+    n = choice.shape[0]
+    route = np.empty(n + 1, dtype = np.int64)
+    visited = np.zeros(n, dtype = np.bool_)
+    node = start
+    route[0] = node
+    visited[node] = True
+    for step in range(1, n):
+        node = Pick(choice, visited, node, uniforms[step - 1], False)
+        route[step] = node
+        visited[node] = True
+    route[n] = route[0]
+    return route
+
+def Triangle(i, j, n):
+    """ Pheromone.Triangle for one city pair """
+    if i > j:
+        i, j = j, i
+    return i*(2*n - i - 1)//2 + j - i - 1
+
+def LocalUpdateKernel(tau, choice, greedy, etaB, i, j, keep, add, alpha):
+    """ the ACS local update (1-eps)*tau + eps*t0, given as keep*tau + add """
+    tau[i, j] = keep*tau[i, j] + add
+    greedy[i, j] = tau[i, j]*etaB[i, j]
+    choice[i, j] = tau[i, j]**alpha*etaB[i, j]
+
+def PackedLocalUpdateKernel(tau, choice, greedy, etaB, i, j, keep, add, alpha):
+    """ LocalUpdateKernel on the packed store: one value, both directions refreshed """
+    k = Triangle(i, j, choice.shape[0])
+    tau[k] = keep*tau[k] + add
+    greedy[i, j] = tau[k]*etaB[i, j]
+    choice[i, j] = tau[k]**alpha*etaB[i, j]
+    greedy[j, i] = tau[k]*etaB[j, i]
+    choice[j, i] = tau[k]**alpha*etaB[j, i]
+
+def ACSStep(choice, greedy, visited, node, q0, uniforms, used):
+    """ the next node of an ACS ant and the number of uniforms used so far (one or two per step) """
+    exploit = uniforms[used] < q0
+    used += 1
+    if exploit:
+        nextNode = Pick(greedy, visited, node, 0.0, True)
+        if nextNode < 0:
+            nextNode = Uniform(visited, uniforms[used])
+            used += 1
+    else:
+        nextNode = Pick(choice, visited, node, uniforms[used], False)
+        used += 1
+    return nextNode, used
+
+def ACSTravelKernel(choice, greedy, tau, etaB, keep, add, q0, alpha, symmetric, start, uniforms):
+    """ ArrayACSTravel on an n x n store with the local update applied in place
+        (to (j, i) as well when symmetric). Returns the route and the number
+        of uniforms used """
+    n = choice.shape[0]
+    route = np.empty(n + 1, dtype = np.int64)
+    visited = np.zeros(n, dtype = np.bool_)
+    node = start
+    route[0] = node
+    visited[node] = True
+    used = 0
+    for step in range(1, n):
+        nextNode, used = ACSStep(choice, greedy, visited, node, q0, uniforms, used)
+        LocalUpdateKernel(tau, choice, greedy, etaB, node, nextNode, keep, add, alpha)
+        if symmetric:
+            LocalUpdateKernel(tau, choice, greedy, etaB, nextNode, node, keep, add, alpha)
+        node = nextNode
+        route[step] = node
+        visited[node] = True
+    route[n] = route[0]
+    return route, used
+
+def PackedACSTravelKernel(choice, greedy, tau, etaB, keep, add, q0, alpha, start, uniforms):
+    """ ACSTravelKernel on the packed store """
+    n = choice.shape[0]
+    route = np.empty(n + 1, dtype = np.int64)
+    visited = np.zeros(n, dtype = np.bool_)
+    node = start
+    route[0] = node
+    visited[node] = True
+    used = 0
+    for step in range(1, n):
+        nextNode, used = ACSStep(choice, greedy, visited, node, q0, uniforms, used)
+        PackedLocalUpdateKernel(tau, choice, greedy, etaB, node, nextNode, keep, add, alpha)
+        node = nextNode
+        route[step] = node
+        visited[node] = True
+    route[n] = route[0]
+    return route, used
+
+def DepositClampKernel(tau, route, amount, tmax, symmetric):
+    """ MMASUpdatepheromone: deposit amount on every arc (both directions when
+        symmetric), then clip at tmax """
+    for k in range(route.shape[0] - 1):
+        tau[route[k], route[k+1]] += amount
+    if symmetric:
+        for k in range(route.shape[0] - 1):
+            tau[route[k+1], route[k]] += amount
+    for k in range(route.shape[0] - 1):
+        tau[route[k], route[k+1]] = min(tau[route[k], route[k+1]], tmax)
+    if symmetric:
+        for k in range(route.shape[0] - 1):
+            tau[route[k+1], route[k]] = min(tau[route[k+1], route[k]], tmax)
+
+def EvaporateClampKernel(tau, route, tmin, keep, symmetric):
+    """ MMASevaporate: evaporate every arc (both directions when symmetric) by keep = 1-rho,
+        then floor at tmin """
+    for k in range(route.shape[0] - 1):
+        tau[route[k], route[k+1]] = keep*tau[route[k], route[k+1]]
+        if symmetric:
+            tau[route[k+1], route[k]] = keep*tau[route[k+1], route[k]]
+    for k in range(route.shape[0] - 1):
+        tau[route[k], route[k+1]] = max(tau[route[k], route[k+1]], tmin)
+    if symmetric:
+        for k in range(route.shape[0] - 1):
+            tau[route[k+1], route[k]] = max(tau[route[k+1], route[k]], tmin)
+
+def PackedDepositClampKernel(tau, route, amount, tmax, n):
+    """ DepositClampKernel on the packed store """
+    for k in range(route.shape[0] - 1):
+        tau[Triangle(route[k], route[k+1], n)] += amount
+    for k in range(route.shape[0] - 1):
+        key = Triangle(route[k], route[k+1], n)
+        tau[key] = min(tau[key], tmax)
+
+def PackedEvaporateClampKernel(tau, route, tmin, keep, n):
+    """ EvaporateClampKernel on the packed store """
+    for k in range(route.shape[0] - 1):
+        key = Triangle(route[k], route[k+1], n)
+        tau[key] = keep*tau[key]
+    for k in range(route.shape[0] - 1):
+        key = Triangle(route[k], route[k+1], n)
+        tau[key] = max(tau[key], tmin)
+
+NAMES = ("Uniform", "Pick", "TravelKernel", "Triangle", "LocalUpdateKernel", "PackedLocalUpdateKernel", "ACSStep",
+         "ACSTravelKernel", "PackedACSTravelKernel", "DepositClampKernel", "EvaporateClampKernel",
+         "PackedDepositClampKernel", "PackedEvaporateClampKernel")
+
+def Compile():
+    """ numba versions of the kernels, compiled lazily on first call. The
+        kernels call each other through their globals, which numba resolves at
+        compile time, so the compiled ones get a namespace of their own where
+        those names are compiled too; the module's python kernels are unchanged """
+    namespace = dict(globals())
+    for name in NAMES:
+        kernel = globals()[name]
+        namespace[name] = numba.njit(cache = True)(types.FunctionType(kernel.__code__, namespace, name,
+                                                                        kernel.__defaults__))
+    return {name: namespace[name] for name in NAMES}
+
+#------------------------------------BACKEND SELECTION---------------------------------------------------
+
+KERNELS = {"python": {name: globals()[name] for name in NAMES}}
+BACKEND = "numpy"
+
+def Available():
+    """ the backends that can run here """
+    return [name for name in BACKENDS if name != "numba" or numba is not None]
+
+def Select(name = None):
+    """ selects the backend by name (None: numba when installed, else numpy)
+        and returns the name of the backend in use """
+    global BACKEND
+    if name is None:
+        name = "numba" if numba is not None else "numpy"
+    if name not in Available():
+        raise ValueError("kernel backend %r is not available here (available: %s)" % (name, ", ".join(Available())))
+    if name == "numba" and "numba" not in KERNELS:
+        KERNELS["numba"] = Compile()
+    BACKEND = name
+    return BACKEND
+
+def Backend():
+    """ the backend in use """
+    return BACKEND
+
+def Active(dropout = False, cand = None):
+    """ whether the kernels handle a construction. Dropout and candidate
+        lists always take the numpy path """
+    return BACKEND != "numpy" and not dropout and cand is None
+
+#------------------------------------ENTRY POINTS--------------------------------------------------------
+
+def Travel(choice, rng, start = None):
+    """ kernel ArrayTravel: same random draws as the numpy path """
+    n = len(choice)
+    node = int(rng.integers(n)) if start is None else int(start)
+    return KERNELS[BACKEND]["TravelKernel"](np.ascontiguousarray(choice), node, rng.random(n - 1))
+
+def Scalars(pheromoneGraph, *values):
+    """ values in the dtype of the store. NumPy does float32 arithmetic with python
+        floats in float32, numba in float64, so the kernels get them cast """
+    return [pheromoneGraph.dtype.type(value) for value in values]
+
+def ACSTravel(choice, greedy, pheromoneGraph, etaB, t0, eps, q0, alpha, rng, start = None, symmetric = True):
+    """ kernel ArrayACSTravel, on any layout. The uniforms are drawn up front;
+        the generator is then rewound and advanced by the number actually
+        used, so it ends where the numpy path leaves it """
+    n = len(choice)
+    node = int(rng.integers(n)) if start is None else int(start)
+    state = rng.bit_generator.state
+    uniforms = rng.random(2*(n - 1))
+    keep, add = Scalars(pheromoneGraph, 1-eps, eps*t0)
+    if np.ndim(pheromoneGraph) == 1:
+        route, used = KERNELS[BACKEND]["PackedACSTravelKernel"](choice, greedy, pheromoneGraph, etaB, keep, add, q0,
+                                                                alpha, node, uniforms)
+    else:
+        route, used = KERNELS[BACKEND]["ACSTravelKernel"](choice, greedy, pheromoneGraph, etaB, keep, add, q0, alpha,
+                                                          symmetric, node, uniforms)
+    rng.bit_generator.state = state
+    rng.random(used)
+    return route
+
+def Clampable(pheromoneGraph, cand = None):
+    """ whether the clamp kernels handle an update: any layout without candidate lists """
+    return BACKEND != "numpy" and cand is None and isinstance(pheromoneGraph, np.ndarray)
+
+def DepositClamp(pheromoneGraph, route, amount, tmax, symmetric = True):
+    amount, tmax = Scalars(pheromoneGraph, amount, tmax)
+    route = np.asarray(route, dtype = np.int64)
+    if np.ndim(pheromoneGraph) == 1:
+        KERNELS[BACKEND]["PackedDepositClampKernel"](pheromoneGraph, route, amount, tmax,
+                                                     Pheromone.Cities(pheromoneGraph))
+    else:
+        KERNELS[BACKEND]["DepositClampKernel"](pheromoneGraph, route, amount, tmax, symmetric)
+    return pheromoneGraph
+
+def EvaporateClamp(pheromoneGraph, route, tmin, rho, symmetric = True):
+    tmin, keep = Scalars(pheromoneGraph, tmin, 1-rho)
+    route = np.asarray(route, dtype = np.int64)
+    if np.ndim(pheromoneGraph) == 1:
+        KERNELS[BACKEND]["PackedEvaporateClampKernel"](pheromoneGraph, route, tmin, keep,
+                                                       Pheromone.Cities(pheromoneGraph))
+    else:
+        KERNELS[BACKEND]["EvaporateClampKernel"](pheromoneGraph, route, tmin, keep, symmetric)
+    return pheromoneGraph
+
+#------------------------------------CROSS CHECK---------------------------------------------------------
+
+def Check(backend = None, n = 60, seed = 0, dtype = np.float64):
+    """ runs the numpy path and backend (default: the one in use) on the same
+        random instance and seed, in every pheromone layout, with pheromones
+        of dtype, and raises AssertionError unless the tours, pheromones and
+        generator states are identical. Returns True """
+    import Engine
+    backend = backend or BACKEND
+    previous = BACKEND
+    rng = np.random.default_rng(seed)
+    coords = rng.random((n, 2))
+    cost = np.sqrt(((coords[:, None] - coords[None])**2).sum(axis = -1))
+    eta = Engine.Heuristic(cost, dtype)
+    etaB = eta**3
+    tau = rng.uniform(0.5, 1.5, (n, n)).astype(dtype)
+    try:
+        for layout in Pheromone.LAYOUTS:
+            symmetric = layout != "directed"
+            results = {}
+            for name in ("numpy", backend):
+                Select(name)
+                rng = np.random.default_rng(seed)
+                PRM = Pheromone.Pack(tau) if layout == "packed" else tau.copy()
+                choice, greedy = Engine.ChoiceMatrix(PRM, eta, 1, 3), Pheromone.Dense(PRM)*etaB
+                routes = [Engine.ArrayTravel(choice, rng) for ant in range(3)]
+                routes += [Engine.ArrayACSTravel(choice, greedy, PRM, etaB, 0.01, 0.1, 0.9, 1, rng,
+                                                 symmetric = symmetric) for ant in range(3)]
+                if Clampable(PRM):
+                    DepositClamp(PRM, routes[0], 0.3, 1.2, symmetric)
+                    EvaporateClamp(PRM, routes[1], 0.6, 0.2, symmetric)
+                else:
+                    Pheromone.Deposit(PRM, routes[0], 0.3, symmetric)
+                    Pheromone.Clamp(PRM, routes[0], tmax = 1.2, symmetric = symmetric)
+                    for i, j in Pheromone.Pairs(PRM, *Pheromone.Arcs(routes[1]), symmetric):
+                        key, found = Pheromone.Key(PRM, i, j)
+                        PRM[key] = (1-0.2)*PRM[key]
+                    Pheromone.Clamp(PRM, routes[1], tmin = 0.6, symmetric = symmetric)
+                results[name] = (routes, PRM, choice, greedy, rng.random())
+            expected, got = results["numpy"], results[backend]
+            # raised, not asserted, so the check also holds under python -O
+            if not all(np.array_equal(a, b) for a, b in zip(expected[0], got[0])):
+                raise AssertionError(layout + ": tours differ")
+            if not all(np.array_equal(a, b) for a, b in zip(expected[1:4], got[1:4])):
+                raise AssertionError(layout + ": pheromones differ")
+            if expected[4] != got[4]:
+                raise AssertionError(layout + ": random streams differ")
+    finally:
+        Select(previous)
+    return True
+
+Select(os.environ.get("ACO_BACKEND"))
@@ -0,0 +1,154 @@
+# 2-opt and Or-opt local search over nearest neighbour lists with don't look bits.
+# Every move is evaluated in O(1) from the cost matrix (or RouteMatrix.Implicit)
+import collections
+import numpy as np
+import Engine
+
+MODES = ("all", "ibest", "bsf")
+
+def Reverse(tour, pos, i, j):
+    """ reverses the cyclic stretch of tour from position i to position j,
+        or the complementary stretch when that one is shorter """
+    n = len(tour)
+    inner = (j - i) % n + 1
+    if 2*inner > n:
+        i, j, inner = (j + 1) % n, (i - 1) % n, n - inner
+    for k in range(inner // 2):
+        a, b = (i + k) % n, (j - k) % n
+        tour[a], tour[b] = tour[b], tour[a]
+        pos[tour[a]], pos[tour[b]] = a, b
+
+def TwoOpt(a, tour, pos, cost, cand):
+    """ first improving 2-opt move around city a. Returns the cities
+        whose neighbourhood changed, or None when no move improves """
+    n = len(tour)
+    for forward in (True, False):
+        b = tour[(pos[a] + 1) % n] if forward else tour[pos[a] - 1]
+        dab = cost[a, b]
+        for c in cand[a]:
+            dac = cost[a, c]
+            if dac >= dab:
+                break
+            d = tour[(pos[c] + 1) % n] if forward else tour[pos[c] - 1]
+            if c == b or d == a:
+                continue
+            if dac + cost[b, d] - dab - cost[c, d] < -1e-10:
+                if forward:
+                    Reverse(tour, pos, pos[b], pos[c])
+                else:
+                    Reverse(tour, pos, pos[a], pos[d])
+                return (a, b, c, d)
+    return None
+
+def OrOpt(a, tour, pos, cost, cand, length = 3):
+    """ first improving move of the segment of 1..length cities starting at a
+        between two neighbouring cities of one of its ends (either orientation).
+        Returns the cities whose neighbourhood changed, or None """
+    n = len(tour)
+    for L in range(1, min(length, n - 3) + 1):
+        segment = [tour[(pos[a] + k) % n] for k in range(L)]
+        e = segment[-1]
+        p, nx = tour[pos[a] - 1], tour[(pos[e] + 1) % n]
+        gain = cost[p, a] + cost[e, nx] - cost[p, nx]
+        inside = set(segment)
+        for x, y in ((a, e), (e, a)):
+            for c in cand[x]:
+                if c in inside:
+                    continue
+                dcx = cost[c, x]
+                if dcx >= gain:
+                    break
+                for f in (tour[(pos[c] + 1) % n], tour[pos[c] - 1]):
+                    if f in inside:
+                        continue
+                    if dcx + cost[y, f] - cost[c, f] - gain < -1e-10:
+                        Move(tour, pos, segment, c, f, x)
+                        return (a, e, p, nx, c, f)
+    return None
+
+def Move(tour, pos, segment, c, f, x):
+    """ takes segment out of tour and puts it between the neighbours c and f
+        with its end x next to c """
+    n = len(tour)
+    start = (pos[segment[-1]] + 1) % n
+    rest = [tour[(start + k) % n] for k in range(n - len(segment))]
+    i = rest.index(c)
+    if rest[(i + 1) % len(rest)] != f:
+        i -= 1          # f comes before c: insert between f and c
+        oriented = segment if x == segment[-1] else segment[::-1]
+    else:
+        oriented = segment if x == segment[0] else segment[::-1]
+    tour[:] = rest[:i+1] + oriented + rest[i+1:]
+    for k, city in enumerate(tour):
+        pos[city] = k
+
+def Improve(route, cost, cand, moves = ("2opt", "oropt")):
+    """ takes a route (length n+1, start repeated) and returns a local optimum
+        of the chosen moves, searched with don't look bits """
+    tour = [int(city) for city in route[:-1]]
+    n = len(tour)
+    if n < 5:
+        return np.asarray(route)
+    pos = [0]*n
+    for k, city in enumerate(tour):
+        pos[city] = k
+    if isinstance(cand, np.ndarray):
+        cand = cand.tolist()
+    queue = collections.deque(tour)
+    queued = [True]*n       # don't look bit is off while a city is queued
+    while queue:
+        a = queue.popleft()
+        queued[a] = False
+        changed = None
+        if "2opt" in moves:
+            changed = TwoOpt(a, tour, pos, cost, cand)
+        if changed is None and "oropt" in moves:
+            changed = OrOpt(a, tour, pos, cost, cand)
+        for city in changed or ():
+            if not queued[city]:
+                queued[city] = True
+                queue.append(city)
+    return np.array(tour + tour[:1], dtype = np.int64)
+
+def Symmetrized(cost, symmetric = True):
+    """ the costs the moves search on: cost itself, or (cost + cost.T)/2 for
+        asymmetric costs. Built once per run and passed to Apply as search """
+    return cost if symmetric else (cost + cost.T)/2
+
+def Apply(routes, costs, cost, cand, mode = "all", BSFCost = None, moves = ("2opt", "oropt"), symmetric = True,
+          search = None):
+    """ local search stage of the solvers: improves every route ("all"), the
+        iteration best ("ibest"), or the iteration best when it is about to
+        become the best so far ("bsf"). Returns the routes and their costs.
+        The moves assume symmetric costs (they reverse stretches): asymmetric
+        ones are searched on search (Symmetrized, built here when None), the
+        cheaper direction of the result is kept, and only when it beats the
+        route it came from """
+    if mode not in MODES:
+        raise ValueError("local_search must be one of " + ", ".join(MODES))
+    if mode == "all":
+        ants = range(len(routes))
+    else:
+        best = int(np.argmin(costs))
+        ants = [best] if mode == "ibest" or BSFCost is None or costs[best] < BSFCost else []
+    if len(ants):
+        cand = np.asarray(cand).tolist()
+    before = None
+    if len(ants) and not symmetric:
+        before = routes.copy()
+        search = Symmetrized(cost, symmetric) if search is None else search
+    elif search is None:
+        search = cost
+    for ant in ants:
+        routes[ant] = Improve(routes[ant], search, cand, moves)
+    if len(ants):
+        improved = Engine.TourCosts(cost, routes)
+        if before is not None:
+            reverse = routes[:, ::-1]
+            reverseCosts = Engine.TourCosts(cost, reverse)
+            flip = reverseCosts < improved
+            routes[flip], improved[flip] = reverse[flip], reverseCosts[flip]
+            worse = improved > costs
+            routes[worse], improved[worse] = before[worse], costs[worse]
+        costs = improved
+    return routes, costs
@@ -0,0 +1,121 @@
+# Instrumentation of the solvers: per phase timers, per iteration records for the
+# on_iteration callback and the timings mode, pheromone stagnation metrics (added to
+# the records when the solver is called with metrics = True) and export
+import csv
+import json
+import math
+import time
+import numpy as np
+import Pheromone
+
+PHASES = ("construction", "cost", "local_search", "evaporation", "deposit")
+
+class Timer:
+    """ wall time of the phases of one iteration. Mark(phase) books the time since
+        the previous mark to phase. A disabled timer does nothing, so the solvers
+        can mark unconditionally """
+
+    def __init__(self, enabled = True):
+        self.enabled = enabled
+        self.start = self.last = time.perf_counter()
+        self.phases = dict.fromkeys(PHASES, 0.0)
+
+    def Reset(self):
+        """ starts a new iteration """
+        if self.enabled:
+            self.phases = dict.fromkeys(PHASES, 0.0)
+            self.last = time.perf_counter()
+
+    def Mark(self, phase):
+        if self.enabled:
+            now = time.perf_counter()
+            self.phases[phase] += now - self.last
+            self.last = now
+
+    def Elapsed(self):
+        return time.perf_counter() - self.start
+
+#------------------------------------STAGNATION METRICS--------------------------------------------------
+
+def OffDiagonal(pheromoneGraph):
+    """ the pheromone of every arc as an (n, m) float array: the n x n matrix
+        (a packed store expanded) without its diagonal, or the (n, k) candidate store as it is """
+    tau = np.asarray(Pheromone.Dense(pheromoneGraph), dtype = float)
+    n = len(tau)
+    if tau.shape == (n, n):
+        tau = tau[~np.eye(n, dtype = bool)].reshape(n, n - 1)
+    return tau
+
+def Entropy(tau):
+    """ mean over the nodes of the entropy of their outgoing pheromone, normalized
+        to [0, 1]: 1 for uniform pheromone, towards 0 as the colony converges """
+    p = tau/tau.sum(axis = 1, keepdims = True)
+    logs = np.log(p, out = np.zeros_like(p), where = p > 0)
+    return float(-(p*logs).sum(axis = 1).mean()/math.log(tau.shape[1])) if tau.shape[1] > 1 else 0.0
+
+def Branching(tau, lam = 0.05):
+    """ mean lambda-branching factor: arcs per node whose pheromone is at least
+        tmin + lam*(tmax - tmin) of that node. Near 1 (or 2 for symmetric
+        deposits) the search has stagnated """
+    lo, hi = tau.min(axis = 1, keepdims = True), tau.max(axis = 1, keepdims = True)
+    return float((tau >= lo + lam*(hi - lo)).sum(axis = 1).mean())
+
+#------------------------------------RECORDS-------------------------------------------------------------
+
+def Record(iteration, IBEST, BSF, timer, pheromoneGraph = None):
+    """ the per iteration record: iteration, IBEST and BSF cost, elapsed seconds,
+        seconds per phase and, given the pheromones, entropy and branching """
+    record = {"iteration": iteration, "IBEST": IBEST["Cost"], "BSF": BSF["Cost"], "elapsed": timer.Elapsed()}
+    record.update(timer.phases)
+    if pheromoneGraph is not None:
+        tau = OffDiagonal(pheromoneGraph)
+        record["entropy"], record["branching"] = Entropy(tau), Branching(tau)
+    return record
+
+def Export(records, filepath):
+    """ writes the records to filepath as CSV (.csv) or JSON (anything else) """
+    if filepath.lower().endswith(".csv"):
+        fields = list(dict.fromkeys(key for record in records for key in record))
+        with open(filepath, "w", newline = "") as f:
+            writer = csv.DictWriter(f, fieldnames = fields)
+            writer.writeheader()
+            writer.writerows(records)
+    else:
+        with open(filepath, "w") as f:
+            json.dump(records, f, indent = 1)
+
+#------------------------------------STOPPING RULES------------------------------------------------------
+
+class Budget:
+    """ stopping rules on top of the iteration count: a wall clock budget in
+        seconds (counted from the solver call, checked after every iteration),
+        a target cost and a window of iterations without BSF improvement """
+
+    def __init__(self, time_limit = None, target = None, patience = None):
+        self.deadline = None if time_limit is None else time.perf_counter() + time_limit
+        self.target = target
+        self.patience = patience
+        self.best = math.inf
+        self.stale = 0
+
+    def Iterations(self, iterations):
+        """ iterations = None runs until one of the other rules stops the run """
+        if iterations is not None:
+            return iterations
+        if self.deadline is None and self.target is None and self.patience is None:
+            raise ValueError("iterations = None needs a time_limit, target or patience")
+        return math.inf
+
+    def Check(self, BSFCost):
+        """ returns why the run should stop now, or None """
+        if BSFCost < self.best:
+            self.best, self.stale = BSFCost, 0
+        else:
+            self.stale += 1
+        if self.target is not None and BSFCost <= self.target:
+            return "target"
+        if self.patience is not None and self.stale >= self.patience:
+            return "patience"
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            return "time_limit"
+        return None
@@ -0,0 +1,136 @@
+# Multiprocess colony runner: ants of one iteration are spread over a process pool.
+# The cost graph and the per iteration pheromone/choice matrices live in shared memory,
+# only routes and costs travel back to the parent for the pheromone update.
+import weakref
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+import Engine
+import RouteMatrix
+
+ATTACHED = {}   # worker side: shared memory name -> (SharedMemory, ndarray)
+
+def Attach(name, shape, dtype):
+    """ worker side view of a shared array, attached once per process """
+    if name not in ATTACHED:
+        # workers share the parent's resource tracker, so the parent's unlink cleans up
+        shm = shared_memory.SharedMemory(name = name)
+        ATTACHED[name] = (shm, np.ndarray(shape, dtype = dtype, buffer = shm.buf))
+    return ATTACHED[name][1]
+
+def Work(task):
+    """ builds count tours in a worker and returns their routes and costs """
+    kind, specs, count, seed, params = task
+    arrays = {key: Attach(*spec) for key, spec in specs.items()}
+    rng = np.random.default_rng(seed)
+    cand = arrays.get("cand")
+    if "coords" in arrays:
+        cost = RouteMatrix.Implicit(arrays["coords"], params["kind"])
+    else:
+        cost = arrays["cost"]
+    if kind == "ACS":
+        if params["batch"]:
+            routes = Engine.BatchACSTravel(arrays["choice"], arrays["greedy"], arrays["tau"], arrays["etaB"],
+                                           params["t0"], count, params["eps"], params["q0"], params["alpha"],
+                                           rng, params["dropout"], cand, cost, params["symmetric"])
+        else:
+            routes = np.array([Engine.ArrayACSTravel(arrays["choice"], arrays["greedy"], arrays["tau"],
+                                                     arrays["etaB"], params["t0"], params["eps"], params["q0"],
+                                                     params["alpha"], rng, params["dropout"], cand = cand,
+                                                     cost = cost, symmetric = params["symmetric"])
+                               for ant in range(count)])
+    else:
+        routes = Engine.BatchTravel(arrays["choice"], count, rng, params["dropout"], params["p"], cand, cost)
+    return routes.astype(np.int32), Engine.TourCosts(cost, routes)
+
+def Release(pool, segments):
+    if pool is not None:
+        pool.terminate()
+    for shm in segments.values():
+        shm.close()
+        shm.unlink()
+
+class Colony:
+    """ process pool plus the shared arrays its workers read.
+        cost: cost matrix or RouteMatrix.Implicit (whose coordinates are
+        shared instead), workers: pool size, seed: seeds the
+        independent RNG stream handed to every task """
+
+    def __init__(self, cost, workers = None, seed = None):
+        self.workers = workers or multiprocessing.cpu_count()
+        self.seeds = np.random.SeedSequence(seed)
+        self.segments = {}
+        self.arrays = {}
+        # sharing before the pool starts lets the workers inherit the resource tracker
+        if hasattr(cost, "Nearest"):
+            self.costKey, self.base = "coords", {"kind": cost.kind}
+            self.Put("coords", cost.coords)
+        else:
+            self.costKey, self.base = "cost", {}
+            self.Put("cost", cost)
+        try:
+            self.pool = multiprocessing.Pool(self.workers)
+        except BaseException:
+            # no finalizer yet: free the segments shared above before giving up
+            Release(None, self.segments)
+            raise
+        self.finalizer = weakref.finalize(self, Release, self.pool, self.segments)
+
+    def Put(self, key, array, once = False):
+        """ copies array into the shared buffer key, (re)allocating it
+            when the shape or dtype changed. once skips the copy when
+            key is already shared (arrays fixed for the whole run) """
+        if once and key in self.arrays:
+            return
+        array = np.asarray(array)
+        if key not in self.arrays or self.arrays[key].shape != array.shape or self.arrays[key].dtype != array.dtype:
+            if key in self.segments:
+                self.segments[key].close()
+                self.segments[key].unlink()
+            self.segments[key] = shared_memory.SharedMemory(create = True, size = max(array.nbytes, 1))
+            self.arrays[key] = np.ndarray(array.shape, dtype = array.dtype, buffer = self.segments[key].buf)
+        np.copyto(self.arrays[key], array)
+
+    def Run(self, kind, keys, Population, params):
+        """ splits Population ants over the workers and gathers routes and costs """
+        keys = keys + [self.costKey]
+        params = dict(self.base, **params)
+        specs = {key: (self.segments[key].name, self.arrays[key].shape, self.arrays[key].dtype) for key in keys}
+        counts = [len(c) for c in np.array_split(np.arange(Population), min(self.workers, Population))]
+        tasks = [(kind, specs, count, seed, params) for count, seed in zip(counts, self.seeds.spawn(len(counts)))]
+        results = self.pool.map(Work, tasks)
+        return (np.concatenate([routes for routes, costs in results]).astype(np.int64),
+                np.concatenate([costs for routes, costs in results]))
+
+    def Travel(self, choice, Population, dropout = False, p = 0.01, cand = None):
+        """ parallel Engine.BatchTravel, returns routes and costs """
+        keys = ["choice"]
+        self.Put("choice", choice)
+        if cand is not None:
+            self.Put("cand", cand, once = True)
+            keys.append("cand")
+        return self.Run("AS", keys, Population, {"dropout": dropout, "p": p})
+
+    def ACSTravel(self, choice, greedy, pheromoneGraph, etaB, t0, Population, eps = 0.1, q0 = 0.9, alpha = 1,
+                  dropout = False, cand = None, batch = False, symmetric = True):
+        """ parallel ACS construction. Workers apply the local update to a shared
+            copy of the pheromones without locking; afterwards the parent applies
+            the exact local update for every arc used to pheromoneGraph """
+        keys = ["choice", "greedy", "tau", "etaB"]
+        self.Put("choice", choice)
+        self.Put("greedy", greedy)
+        self.Put("tau", pheromoneGraph)
+        self.Put("etaB", etaB, once = True)
+        if cand is not None:
+            self.Put("cand", cand, once = True)
+            keys.append("cand")
+        routes, costs = self.Run("ACS", keys, Population, {"t0": t0, "eps": eps, "q0": q0, "alpha": alpha,
+                                                           "dropout": dropout, "batch": batch,
+                                                           "symmetric": symmetric})
+        Engine.BatchLocalUpdate(pheromoneGraph, choice, greedy, etaB, routes[:, :-1].ravel(),
+                                routes[:, 1:].ravel(), t0, eps, alpha, cand, symmetric)
+        return routes, costs
+
+    def Close(self):
+        """ stops the pool and frees the shared memory """
+        self.finalizer()
@@ -0,0 +1,162 @@
+# ndarray pheromone store: evaporation and deposits as whole array operations.
+# Layouts: "packed" keeps one value per city pair (the upper triangle as a flat
+# array) for symmetric costs, "directed" a full n x n matrix whose arcs are updated
+# in their own direction only (asymmetric costs), "full" the n x n matrix written
+# in both directions. Candidate list stores are (n, k) in every layout.
+import math
+import numpy as np
+
+LAYOUTS = ("packed", "directed", "full")
+
+def Symmetric(costGraph, block = 1024):
+    """ whether cost[i][j] == cost[j][i] for every pair, compared block by
+        block. On demand costs (RouteMatrix.Implicit) are distances, so symmetric """
+    if hasattr(costGraph, "Nearest"):
+        return True
+    cost = np.asarray(costGraph)
+    for start in range(0, len(cost), block):
+        if not np.array_equal(cost[start:start+block], cost[:, start:start+block].T):
+            return False
+    return True
+
+def Layout(costGraph, layout = None, cand = None):
+    """ the pheromone layout to use: layout itself, or "packed" for symmetric and
+        "directed" for asymmetric costs when None. A candidate list store cannot
+        be packed, so "packed" becomes "full" there """
+    if layout is None:
+        layout = "packed" if Symmetric(costGraph) else "directed"
+    if layout not in LAYOUTS:
+        raise ValueError("layout must be one of " + ", ".join(LAYOUTS))
+    return "full" if layout == "packed" and cand is not None else layout
+
+def Init(n, value, dtype = np.float64, cand = None, layout = "full"):
+    """ returns an n x n pheromone matrix filled with value, an (n, k) one
+        holding only the candidate arcs of cand, or the n(n-1)/2 packed store """
+    if cand is None and layout == "packed":
+        return np.full(n*(n - 1)//2, value, dtype = dtype)
+    return np.full((n, n) if cand is None else cand.shape, value, dtype = dtype)
+
+#------------------------------------PACKED STORE--------------------------------------------------------
+
+def Cities(pheromoneGraph):
+    """ number of cities of a pheromone store """
+    if np.ndim(pheromoneGraph) == 1:
+        return (1 + math.isqrt(1 + 8*len(pheromoneGraph)))//2
+    return len(pheromoneGraph)
+
+def Triangle(starts, ends, n):
+    """ positions of the city pairs (starts, ends), in either order, in the packed store """
+    i, j = np.minimum(starts, ends), np.maximum(starts, ends)
+    return i*(2*n - i - 1)//2 + j - i - 1
+
+def Dense(pheromoneGraph, diagonal = 0):
+    """ the n x n matrix of a store: the packed store mirrored with diagonal
+        on the diagonal, any other store as is """
+    if np.ndim(pheromoneGraph) != 1:
+        return pheromoneGraph
+    n = Cities(pheromoneGraph)
+    out = np.empty((n, n), dtype = pheromoneGraph.dtype)
+    start = 0
+    for i in range(n - 1):
+        row = pheromoneGraph[start:start + n - i - 1]
+        out[i, i+1:] = row
+        out[i+1:, i] = row
+        start += n - i - 1
+    np.fill_diagonal(out, diagonal)
+    return out
+
+def Pack(matrix):
+    """ the packed store of the upper triangle of an n x n matrix """
+    n = len(matrix)
+    out = np.empty(n*(n - 1)//2, dtype = matrix.dtype)
+    start = 0
+    for i in range(n - 1):
+        out[start:start + n - i - 1] = matrix[i, i+1:]
+        start += n - i - 1
+    return out
+
+def AsArray(pheromoneGraph):
+    """ returns pheromoneGraph itself when it is already an ndarray
+        (so updates stay in place) or a float array copy of it """
+    if isinstance(pheromoneGraph, np.ndarray):
+        return pheromoneGraph
+    return np.asarray(pheromoneGraph, dtype = float)
+
+def Arcs(routes):
+    """ takes a route (n+1,) or a route array (Population, n+1)
+        and returns the start and end nodes of every arc """
+    routes = np.asarray(routes)
+    return routes[..., :-1], routes[..., 1:]
+
+def Index(starts, ends, cand = None):
+    """ positions of the arcs (starts, ends) in the pheromone store: returns
+        the row and column indices of the stored arcs and a mask of which arcs
+        are stored at all (arcs outside the candidate lists are not) """
+    starts, ends = np.atleast_1d(starts), np.atleast_1d(ends)
+    if cand is None:
+        return starts, ends, np.ones(starts.shape, dtype = bool)
+    hit = cand[starts] == ends[..., None]
+    found = hit.any(axis = -1)
+    return starts[found], hit.argmax(axis = -1)[found], found
+
+def Key(pheromoneGraph, starts, ends, cand = None):
+    """ Index for any layout: returns the index of the arcs (starts, ends) into
+        pheromoneGraph (one flat position per pair in the packed store, row and
+        column otherwise) and the mask of the arcs stored """
+    if np.ndim(pheromoneGraph) == 1:
+        starts, ends = np.atleast_1d(starts), np.atleast_1d(ends)
+        return (Triangle(starts, ends, Cities(pheromoneGraph)),), np.ones(starts.shape, dtype = bool)
+    i, j, found = Index(starts, ends, cand)
+    return (i, j), found
+
+def Pairs(pheromoneGraph, starts, ends, symmetric = True):
+    """ the (starts, ends) arrays to write: both directions of a symmetric
+        update, except in the packed store where one write covers both """
+    if symmetric and np.ndim(pheromoneGraph) != 1:
+        return ((starts, ends), (ends, starts))
+    return ((starts, ends),)
+
+def InTour(route, starts, ends, symmetric = True):
+    """ boolean mask telling which arcs (starts, ends) belong to route,
+        in either direction, or in the route's direction only when not
+        symmetric. Uses successor and predecessor arrays so the lookup
+        is O(1) per arc """
+    route = np.asarray(route)
+    succ = np.empty(len(route) - 1, dtype = np.int64)
+    succ[route[:-1]] = route[1:]
+    if not symmetric:
+        return succ[starts] == ends
+    pred = np.empty(len(route) - 1, dtype = np.int64)
+    pred[route[1:]] = route[:-1]
+    return (succ[starts] == ends) | (pred[starts] == ends)
+
+def Evaporate(pheromoneGraph, rho, tmin = None):
+    """ in place evaporation of every arc, optionally floored at tmin """
+    pheromoneGraph *= (1-rho)
+    if tmin is not None:
+        np.maximum(pheromoneGraph, tmin, out = pheromoneGraph)
+    return pheromoneGraph
+
+def Deposit(pheromoneGraph, routes, amounts, symmetric = True, cand = None):
+    """ adds amounts to the arcs of routes with one scatter add. amounts is
+        either one value per route or one value per arc of every route """
+    starts, ends = Arcs(routes)
+    amounts = np.broadcast_to(np.asarray(amounts, dtype = pheromoneGraph.dtype)[..., None]
+                              if np.ndim(amounts) < starts.ndim else amounts, starts.shape).ravel()
+    starts, ends = starts.ravel(), ends.ravel()
+    if symmetric:
+        # each pair as (lower, higher), so both directions add up its amounts in the
+        # same order (that of the packed store) and come out equal
+        starts, ends = np.minimum(starts, ends), np.maximum(starts, ends)
+    for i, j in Pairs(pheromoneGraph, starts, ends, symmetric):
+        key, found = Key(pheromoneGraph, i, j, cand)
+        np.add.at(pheromoneGraph, key, amounts[found])
+    return pheromoneGraph
+
+def Clamp(pheromoneGraph, route, tmin = None, tmax = None, cand = None, symmetric = True):
+    """ clips the arcs of route (both directions when symmetric) to [tmin, tmax] """
+    starts, ends = Arcs(route)
+    for i, j in Pairs(pheromoneGraph, starts, ends, symmetric):
+        key, found = Key(pheromoneGraph, i, j, cand)
+        pheromoneGraph[key] = np.clip(pheromoneGraph[key], tmin, tmax)
+    return pheromoneGraph
@@ -1,27 +1,81 @@
 # A random graph
-import random 
+# Random instances built with whole array operations from an explicit, seeded
+# numpy Generator: symmetric and asymmetric random costs, uniform and clustered
+# euclidean instances. Matrices come in the dtype asked for and can be written
+# straight to a memory mapped .npy (out = a file path), block of rows by block of rows
+import random
+import numpy as np
+import RouteMatrix
 
-def RandGraph(dim = 10, domain = (2,4)):
+def Generator(seed = None):
+    """ a numpy Generator from seed (an int, a SeedSequence or a Generator, returned as is) """
+    return seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+
+def Output(shape, dtype = np.float64, out = None):
+    """ the array to fill: a new one, out itself, or a memory mapped .npy when out is a path """
+    if out is None:
+        return np.empty(shape, dtype = dtype)
+    if isinstance(out, str):
+        return np.lib.format.open_memmap(out, mode = "w+", dtype = dtype, shape = shape)
+    return out
+
+#------------------------------------RANDOM COSTS--------------------------------------------------------
+
+def RandomCosts(n, domain = (2,4), seed = None, dtype = np.float64, out = None, block = 1024):
+    """ symmetric n x n matrix of costs uniform in domain with a zero diagonal.
+        Row block i draws the costs above the diagonal and mirrors the
+        blocks drawn before it, so memory stays O(n*block) next to out """
+    rng = Generator(seed)
+    out = Output((n, n), dtype, out)
+    for start in range(0, n, block):
+        end = min(start + block, n)
+        out[start:end] = rng.uniform(domain[0], domain[1], (end - start, n))
+        out[start:end, :start] = out[:start, start:end].T
+        upper = np.triu(out[start:end, start:end], 1)
+        out[start:end, start:end] = upper + upper.T
+    return out
+
+def AsymmetricCosts(n, domain = (2,4), seed = None, dtype = np.float64, out = None, block = 1024):
+    """ n x n matrix of independent costs uniform in domain (cost[i][j] != cost[j][i]) """
+    rng = Generator(seed)
+    out = Output((n, n), dtype, out)
+    for start in range(0, n, block):
+        end = min(start + block, n)
+        out[start:end] = rng.uniform(domain[0], domain[1], (end - start, n))
+        out[np.arange(start, end), np.arange(start, end)] = 0
+    return out
+
+#------------------------------------EUCLIDEAN INSTANCES-------------------------------------------------
+
+def Uniform(n, seed = None, scale = 1.0):
+    """ n x 2 coordinates uniform in the square [0, scale]^2 """
+    return Generator(seed).uniform(0, scale, (n, 2))
+
+def Clustered(n, clusters = 10, spread = 0.05, seed = None, scale = 1.0):
+    """ n x 2 coordinates normally scattered (sd spread*scale) around
+        clusters centres that are uniform in [0, scale]^2 """
+    rng = Generator(seed)
+    centres = rng.uniform(0, scale, (clusters, 2))
+    return centres[rng.integers(0, clusters, n)] + rng.normal(0, spread*scale, (n, 2))
+
+def Euclidean(coords, dtype = np.float64, out = None, asymmetry = 0.0, seed = None, block = 1024):
+    """ cost matrix of coordinates. asymmetry > 0 scales every directed arc
+        by its own factor uniform in [1, 1 + asymmetry] (an asymmetric variant) """
+    out = RouteMatrix.DistanceMatrix(coords, "EXACT", dtype, Output((len(coords), len(coords)), dtype, out), block)
+    if asymmetry:
+        rng = Generator(seed)
+        for start in range(0, len(out), block):
+            out[start:start+block] *= rng.uniform(1, 1 + asymmetry, out[start:start+block].shape)
+    return out
+
+#------------------------------------LEGACY ENTRY POINT--------------------------------------------------
+
+def RandGraph(dim = 10, domain = (2,4), seed = None, dtype = None, out = None):
     """ dim: size of a the graph
-        domain: domain of cost 
-        retuns a symmetric matrix"""
-    
-    b = [(i, str(i)) for i in range(dim)]   
-    matrix = []
-    for i,j in b:
-        j=[]
-        if i == 0:
-            j.append(0)
-            matrix.append(j)
-        else:
-            for k in range(i+1):
-                if k == i:
-                    j.append(0)
-                else:
-                    j.append(random.uniform(domain[0],domain[1]))
-            matrix.append(j)      
-    M = matrix        
-    for i in range(len(M)):
-        for j in range(1,len(M)-len(M[i])+1):
-            M[i].append(M[i+j][i])    
-    return M
\ No newline at end of file
+        domain: domain of cost
+        seed: seed of the numpy Generator, drawn from the global random module when None
+        retuns a symmetric matrix, as nested lists unless a dtype or out is given"""
+    if seed is None:
+        seed = random.getrandbits(64)
+    M = RandomCosts(dim, domain, seed, np.float64 if dtype is None else dtype, out)
+    return M.tolist() if dtype is None and out is None else M
@@ -1,26 +1,246 @@
-import math 
+import math
+import os
+import hashlib
+import collections
+import numpy as np
 
 # calculate distance between cities
 def distance(city1: dict, city2: dict):
     return math.sqrt((city1['x'] - city2['x']) ** 2 + (city1['y'] - city2['y']) ** 2)
 
-# calculate the Travwlling Saleman route matrix 
-def TSRM(filepath):
-    """ filepath is a string with the directory
-    of the file conatining the routes """
-    
-    cities = []
-    points = []
+#------------------------------------TSPLIB READER-------------------------------------------------------
+
+def ReadTSPLIB(filepath):
+    """ reads a TSPLIB .tsp/.atsp file and returns a dict with its header
+        keywords, the node coordinates ("COORDS", n x 2) and/or the
+        explicit edge weights ("WEIGHTS", flat) """
+    header = {}
+    with open(filepath) as f:
+        lines = f.read().split("\n")
+    k = 0
+    while k < len(lines):
+        line = lines[k].strip()
+        k += 1
+        if not line or line == "EOF":
+            continue
+        key = line.split(":")[0].strip().upper()
+        if key == "NODE_COORD_SECTION":
+            n = int(header["DIMENSION"])
+            rows = np.array(" ".join(lines[k:k+n]).split(), dtype = float).reshape(n, -1)
+            header["COORDS"] = rows[:, 1:3]
+            k += n
+        elif key == "EDGE_WEIGHT_SECTION":
+            weights = []
+            while k < len(lines) and not lines[k].strip()[:1].isalpha():
+                weights.append(lines[k])
+                k += 1
+            header["WEIGHTS"] = np.array(" ".join(weights).split(), dtype = float)
+        elif key.endswith("_SECTION"):
+            # DISPLAY_DATA_SECTION, FIXED_EDGES_SECTION, ... are not needed for the costs
+            while k < len(lines) and not lines[k].strip()[:1].isalpha():
+                k += 1
+        elif ":" in line:
+            header[key] = line.split(":", 1)[1].strip()
+    return header
+
+def Explicit(weights, n, fmt = "FULL_MATRIX"):
+    """ takes the flat EDGE_WEIGHT_SECTION and its EDGE_WEIGHT_FORMAT
+        and returns the full n x n matrix """
+    if fmt == "FULL_MATRIX":
+        return weights[:n*n].reshape(n, n)
+    matrix = np.zeros((n, n))
+    # column formats are the transposed row formats
+    fmt = {"UPPER_COL": "LOWER_ROW", "LOWER_COL": "UPPER_ROW",
+           "UPPER_DIAG_COL": "LOWER_DIAG_ROW", "LOWER_DIAG_COL": "UPPER_DIAG_ROW"}.get(fmt, fmt)
+    if fmt == "UPPER_ROW":
+        i, j = np.triu_indices(n, 1)
+    elif fmt == "LOWER_ROW":
+        i, j = np.tril_indices(n, -1)
+    elif fmt == "UPPER_DIAG_ROW":
+        i, j = np.triu_indices(n)
+    elif fmt == "LOWER_DIAG_ROW":
+        i, j = np.tril_indices(n)
+    else:
+        raise ValueError("unsupported EDGE_WEIGHT_FORMAT " + fmt)
+    matrix[i, j] = weights[:len(i)]
+    matrix[j, i] = weights[:len(i)]
+    return matrix
+
+#------------------------------------VECTORIZED DISTANCES------------------------------------------------
+
+def Geo(coords):
+    """ TSPLIB GEO: DDD.MM coordinates to latitude/longitude radians """
+    degrees = np.trunc(coords)
+    return 3.141592*(degrees + 5.0*(coords - degrees)/3.0)/180.0
+
+def Metric(a, b, kind = "EXACT"):
+    """ element wise distances between the points a and b (broadcastable
+        arrays of shape (..., 2)) for the TSPLIB EDGE_WEIGHT_TYPE kind,
+        or exact euclidean distances for "EXACT" """
+    if kind == "GEO":
+        a, b = Geo(a), Geo(b)
+        q1 = np.cos(a[..., 1] - b[..., 1])
+        q2 = np.cos(a[..., 0] - b[..., 0])
+        q3 = np.cos(a[..., 0] + b[..., 0])
+        return np.trunc(6378.388*np.arccos(np.clip(0.5*((1.0+q1)*q2 - (1.0-q1)*q3), -1, 1)) + 1.0)
+    squared = ((a - b)**2).sum(axis = -1)
+    if kind == "ATT":
+        r = np.sqrt(squared/10.0)
+        t = np.floor(r + 0.5)
+        return np.where(t < r, t + 1, t)
+    d = np.sqrt(squared)
+    if kind == "EUC_2D":
+        return np.floor(d + 0.5)
+    if kind == "CEIL_2D":
+        return np.ceil(d)
+    if kind == "EXACT":
+        return d
+    raise ValueError("unsupported EDGE_WEIGHT_TYPE " + kind)
+
+def Distances(a, b, kind = "EXACT"):
+    """ distances between every row of a (m x 2) and every row of b (n x 2) """
+    return Metric(a[:, None, :], b[None, :, :], kind)
+
+def DistanceMatrix(coords, kind = "EXACT", dtype = np.float64, out = None, block = 1024):
+    """ takes n x 2 coordinates and returns the n x n distance matrix,
+        computed block of rows by block of rows so the temporaries stay small.
+        out may be a preallocated (e.g. memory mapped) n x n array """
+    coords = np.asarray(coords, dtype = float)
+    n = len(coords)
+    out = np.empty((n, n), dtype = dtype) if out is None else out
+    for start in range(0, n, block):
+        out[start:start+block] = Distances(coords[start:start+block], coords, kind)
+    if kind == "GEO":
+        np.fill_diagonal(out, 0)
+    return out
+
+#------------------------------------ON DEMAND COSTS-----------------------------------------------------
+
+class Implicit:
+    """ coordinate backed cost matrix for instances too large for a dense n x n
+        matrix. Distances are computed on demand: costs[i] is row i (the last
+        rows used are kept in an LRU cache), costs[i, j] with integer or array
+        indices gives element wise distances and costs[i][j] works as for the
+        nested list costgraphs. Memory grows linearly with n """
+
+    def __init__(self, coords, kind = "EXACT", rows = 256, dtype = np.float64):
+        self.coords = np.asarray(coords, dtype = float)
+        self.kind = kind
+        self.rows = rows
+        self.dtype = dtype
+        self.cache = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self.coords)
+
+    def __getstate__(self):
+        # the row cache is not worth pickling (islands, worker pools)
+        return dict(self.__dict__, cache = collections.OrderedDict())
+
+    def Row(self, i):
+        if i in self.cache:
+            self.cache.move_to_end(i)
+            return self.cache[i]
+        row = Metric(self.coords[i], self.coords, self.kind).astype(self.dtype)
+        if self.kind == "GEO":
+            row[i] = 0
+        self.cache[i] = row
+        if len(self.cache) > self.rows:
+            self.cache.popitem(last = False)
+        return row
+
+    def __getitem__(self, index):
+        if not isinstance(index, tuple):
+            return self.Row(int(index))
+        i, j = np.asarray(index[0]), np.asarray(index[1])
+        d = np.asarray(Metric(self.coords[i], self.coords[j], self.kind), dtype = self.dtype)
+        return np.where(i == j, 0, d) if self.kind == "GEO" else d
+
+    def Nearest(self, k, block = 256):
+        """ (n, k) k nearest neighbours of every node sorted by cost, computed
+            block of rows by block of rows so memory stays O(n*block) """
+        n = len(self)
+        k = min(int(k), n - 1)
+        cand = np.empty((n, k), dtype = np.int64)
+        for start in range(0, n, block):
+            d = Distances(self.coords[start:start+block], self.coords, self.kind)
+            d[np.arange(len(d)), np.arange(start, start + len(d))] = np.inf
+            nearest = np.argpartition(d, k - 1, axis = 1)[:, :k]
+            order = np.argsort(np.take_along_axis(d, nearest, axis = 1), axis = 1)
+            cand[start:start+block] = np.take_along_axis(nearest, order, axis = 1)
+        return cand
+
+#------------------------------------LOADERS-------------------------------------------------------------
+
+def IsTSPLIB(filepath):
+    if filepath.lower().endswith((".tsp", ".atsp")):
+        return True
     with open(filepath) as f:
-        for line in f.readlines():
-            city = line.split(' ')
-            cities.append(dict(index=float(city[0]), x=float(city[1]), y=float(city[2])))
-            points.append((float(city[1]), float(city[2])))
-    cost_matrix = []
-    rank = len(cities)
-    for i in range(rank):
-        row = []
-        for j in range(rank):
-            row.append(distance(cities[i], cities[j]))
-        cost_matrix.append(row)
-    return cost_matrix
\ No newline at end of file
+        first = f.readline().split(":")[0].strip().upper()
+    return first in ("NAME", "TYPE", "COMMENT", "DIMENSION", "EDGE_WEIGHT_TYPE")
+
+def Coordinates(filepath):
+    """ reads "index x y" lines (or a TSPLIB NODE_COORD_SECTION)
+        and returns the n x 2 coordinate array """
+    if IsTSPLIB(filepath):
+        return ReadTSPLIB(filepath)["COORDS"]
+    with open(filepath) as f:
+        rows = np.array(f.read().split(), dtype = float).reshape(-1, 3)
+    return rows[:, 1:]
+
+def CachePath(filepath, cache, dtype):
+    """ cache file of filepath: named after the hash of its content and the dtype """
+    digest = hashlib.sha1()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return os.path.join(cache, digest.hexdigest() + "-" + np.dtype(dtype).name + ".npy")
+
+# calculate the Travwlling Saleman route matrix
+def TSRM(filepath, dtype = np.float64, cache = None, implicit = False):
+    """ filepath is a string with the directory
+    of the file conatining the routes, either "index x y" lines or a TSPLIB
+    file (EUC_2D, CEIL_2D, GEO, ATT, EXPLICIT). Returns the cost matrix as an
+    ndarray. With cache (a directory) the matrix is written to a memory mapped
+    .npy keyed by the file hash and loaded from there on the next call.
+    implicit = True returns an Implicit (on demand) cost matrix instead """
+    if implicit:
+        if not IsTSPLIB(filepath):
+            return Implicit(Coordinates(filepath), "EXACT", dtype = dtype)
+        problem = ReadTSPLIB(filepath)
+        if "COORDS" not in problem:
+            raise ValueError("EXPLICIT instances have no coordinates to compute costs from")
+        return Implicit(problem["COORDS"], problem.get("EDGE_WEIGHT_TYPE", "EUC_2D"), dtype = dtype)
+    path = None
+    if cache is not None:
+        path = CachePath(filepath, cache, dtype)
+        if os.path.exists(path):
+            return np.load(path, mmap_mode = "r")
+        os.makedirs(cache, exist_ok = True)
+
+    if IsTSPLIB(filepath):
+        problem = ReadTSPLIB(filepath)
+        kind = problem.get("EDGE_WEIGHT_TYPE", "EUC_2D")
+        n = int(problem["DIMENSION"])
+        if kind == "EXPLICIT":
+            matrix = Explicit(problem["WEIGHTS"], n, problem.get("EDGE_WEIGHT_FORMAT", "FULL_MATRIX"))
+            coords = None
+        else:
+            coords = problem["COORDS"]
+    else:
+        kind, coords = "EXACT", Coordinates(filepath)
+        n = len(coords)
+
+    if path is None:
+        return DistanceMatrix(coords, kind, dtype) if coords is not None else matrix.astype(dtype)
+    # write to a temporary name first so an interrupted run never leaves a partial cache
+    temp = path + ".%d.tmp" % os.getpid()
+    out = np.lib.format.open_memmap(temp, mode = "w+", dtype = dtype, shape = (n, n))
+    if coords is not None:
+        DistanceMatrix(coords, kind, dtype, out)
+    else:
+        out[:] = matrix
+    out.flush()
+    del out
+    os.replace(temp, path)
+    return np.load(path, mmap_mode = "r")
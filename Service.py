@@ -0,0 +1,356 @@
+#!/usr/bin/env python
+# Anytime solve service: an asyncio server on a local TCP or unix socket that runs the
+# ACO variants in worker processes, off the event loop, and streams every improvement of
+# a job's best so far tour to the client that submitted it. One JSON object per line:
+#
+#   {"op": "solve", "variant": "MMAS", "cost": [[...]] or "file": path, "params": {...}}
+#   {"op": "best", "job": id}       the current best tour of a job, at any moment
+#   {"op": "cancel", "job": id}     ends a queued job at once, a running one after its
+#                                   current iteration
+#   {"op": "jobs"}                  the state of every job
+#
+# A solve answers "queued", "started", one "improved" per new best so far tour and a
+# final "done" (with "stop": "cancelled" when cancelled) or "error". At most `limit`
+# jobs run at once, the others wait for a free slot; a client that disconnects cancels
+# its jobs. Finished jobs can be asked about for `ttl` seconds, and only the `keep`
+# most recent of them are kept.
+#
+#   python Service.py --port 8765 --limit 4
+import os
+import sys
+import json
+import math
+import time
+import random
+import asyncio
+import argparse
+import itertools
+import multiprocessing
+import numpy as np
+import RouteMatrix
+from Islands import VARIANTS
+
+LINE = 2**28            # longest request line read (a cost matrix in JSON)
+HOOKS = ("exchange", "should_stop")
+# workers come from a fork server, so they do not inherit the sockets of the clients
+CONTEXT = multiprocessing.get_context("forkserver")
+
+#------------------------------------WORKER SIDE---------------------------------------------------------
+
+def Route(route):
+    return np.asarray(route).tolist()
+
+def Run(variant, instance, params, pipe, cancel):
+    """ worker process body: solves instance and sends ("improved", tour) for
+        every new best so far tour, then ("done", result) or ("error", ...),
+        down pipe. The solver stops after the iteration in which cancel is set """
+    best = [math.inf]
+
+    def exchange(iteration, tour):
+        if tour["Cost"] < best[0]:
+            best[0] = tour["Cost"]
+            pipe.send(("improved", {"iteration": iteration, "cost": float(tour["Cost"]),
+                                    "route": Route(tour["Route"])}))
+        return None
+
+    try:
+        random.seed(params.get("seed"))
+        costGraph = RouteMatrix.TSRM(instance) if isinstance(instance, str) else np.asarray(instance, dtype = float)
+        result = VARIANTS[variant](costGraph, exchange = exchange, should_stop = cancel.is_set, **params)
+        pipe.send(("done", {"cost": float(result["BSF"]), "route": Route(result["Route"]),
+                            "stop": "cancelled" if result["Stop"] == "callback" else result["Stop"],
+                            "iterations": result["Iterations"]}))
+    except Exception as exception:
+        pipe.send(("error", {"error": repr(exception)}))
+    finally:
+        pipe.close()
+
+#------------------------------------SERVER SIDE---------------------------------------------------------
+
+def Send(writer, message):
+    """ writes message as one JSON line, unless the client has gone """
+    if not writer.is_closing():
+        writer.write((json.dumps(message) + "\n").encode())
+
+class Job:
+    """ one solve: state ("queued", "running", "done", "cancelled" or "error"),
+        best so far tour {"iteration", "cost", "route"} and the connection
+        its events go to """
+
+    def __init__(self, id, variant, instance, params, writer):
+        self.id = id
+        self.variant = variant
+        self.instance = instance
+        self.params = params
+        self.writer = writer
+        self.state = "queued"
+        self.best = None
+        self.cancel = CONTEXT.Event()       # seen by the worker
+        self.cancelled = asyncio.Event()    # seen by Execute while the job waits for a slot
+        self.process = None
+        self.task = None
+        self.finished = None    # time.monotonic() when it ended
+
+    def Summary(self):
+        return {"job": self.id, "variant": self.variant, "state": self.state,
+                "cost": None if self.best is None else self.best["cost"],
+                "iteration": None if self.best is None else self.best["iteration"]}
+
+    def Cancel(self):
+        """ ends the job at once while it waits for a slot, after its current iteration when running """
+        self.cancel.set()
+        self.cancelled.set()
+
+class Service:
+    """ the solve service. limit: jobs running at once (default: every cpu),
+        backlog: jobs allowed to wait for a slot (default: unbounded),
+        keep: finished jobs kept for "best" and "jobs", ttl: seconds they are kept """
+
+    def __init__(self, limit = None, backlog = None, keep = 1000, ttl = 3600):
+        self.limit = limit or os.cpu_count()
+        self.backlog = backlog
+        self.keep = keep
+        self.ttl = ttl
+        self.jobs = {}
+        self.ids = itertools.count(1)
+        self.slots = None
+        self.clients = set()
+
+    async def Start(self, host = "127.0.0.1", port = 8765, path = None):
+        """ starts listening on host:port, or on the unix socket path, and returns the server """
+        self.slots = asyncio.Semaphore(self.limit)
+        if path is not None:
+            return await asyncio.start_unix_server(self.Client, path, limit = LINE)
+        return await asyncio.start_server(self.Client, host, port, limit = LINE)
+
+    async def Serve(self, host = "127.0.0.1", port = 8765, path = None):
+        """ serves until cancelled, then cancels the jobs left """
+        server = await self.Start(host, port, path)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.Close()
+
+    async def Close(self, grace = 10):
+        """ cancels every job, gives the workers grace seconds to stop after
+            their current iteration, kills the ones left and closes the connections """
+        tasks = [job.task for job in self.jobs.values() if job.task is not None and not job.task.done()]
+        for job in self.jobs.values():
+            job.Cancel()
+        if tasks:
+            await asyncio.wait(tasks, timeout = grace)
+        for job in self.jobs.values():
+            if job.process is not None and job.process.is_alive():
+                job.process.kill()
+        await asyncio.gather(*tasks, return_exceptions = True)
+        for writer in list(self.clients):
+            writer.close()
+        await asyncio.sleep(0)      # lets the handlers see their connection close
+
+    #-----------------REQUESTS------------------------------------------------------------------------
+
+    async def Client(self, reader, writer):
+        """ reads the requests of one connection, one JSON object per line """
+        self.clients.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    self.Handle(json.loads(line), writer)
+                except (ValueError, KeyError, TypeError) as exception:
+                    Send(writer, {"event": "error", "error": repr(exception)})
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for job in self.jobs.values():
+                if job.writer is writer and job.state in ("queued", "running"):
+                    job.Cancel()
+            self.clients.discard(writer)
+            writer.close()
+
+    def Find(self, request):
+        job = self.jobs.get(request.get("job"))
+        if job is None:
+            raise KeyError("unknown job %r" % (request.get("job"),))
+        return job
+
+    def Handle(self, request, writer):
+        """ answers one request """
+        op = request.get("op")
+        if op == "solve":
+            variant = request.get("variant", "MMAS")
+            if variant not in VARIANTS:
+                raise ValueError("variant must be one of " + ", ".join(VARIANTS))
+            params = dict(request.get("params", {}))
+            if any(hook in params for hook in HOOKS):
+                raise ValueError("the service sets " + " and ".join(HOOKS) + " itself")
+            active = sum(job.state in ("queued", "running") for job in self.jobs.values())
+            if self.backlog is not None and active >= self.limit + self.backlog:
+                raise ValueError("busy: %d jobs running or waiting" % active)
+            job = Job(next(self.ids), variant, request["file"] if "file" in request else request["cost"],
+                      params, writer)
+            self.jobs[job.id] = job
+            Send(writer, {"event": "queued", "job": job.id})
+            job.task = asyncio.get_running_loop().create_task(self.Execute(job))
+        elif op == "best":
+            job = self.Find(request)
+            Send(writer, dict(job.Summary(), event = "best", route = None if job.best is None else job.best["route"]))
+        elif op == "cancel":
+            job = self.Find(request)
+            job.Cancel()
+            Send(writer, {"event": "cancelling", "job": job.id, "state": job.state})
+        elif op == "jobs":
+            Send(writer, {"event": "jobs", "jobs": [job.Summary() for job in self.jobs.values()]})
+        else:
+            raise ValueError("op must be one of solve, best, cancel, jobs")
+
+    #-----------------JOBS----------------------------------------------------------------------------
+
+    async def Slot(self, job):
+        """ waits for a free slot and returns True holding it, or False (holding
+            none) as soon as job is cancelled """
+        acquire = asyncio.ensure_future(self.slots.acquire())
+        cancelled = asyncio.ensure_future(job.cancelled.wait())
+        try:
+            await asyncio.wait((acquire, cancelled), return_when = asyncio.FIRST_COMPLETED)
+        finally:
+            cancelled.cancel()
+            acquire.cancel()        # no-op once it has the slot
+        try:
+            await acquire
+        except asyncio.CancelledError:
+            return False
+        if job.cancelled.is_set():
+            self.slots.release()
+            return False
+        return True
+
+    async def Execute(self, job):
+        """ waits for a free slot, runs job in a worker process and relays its
+            events as the worker sends them (the pipe is watched by the loop) """
+        if not await self.Slot(job):
+            self.Finish(job, "done", {"cost": None, "route": None, "stop": "cancelled", "iterations": 0})
+            return
+        try:
+            loop = asyncio.get_running_loop()
+            receiver, sender = CONTEXT.Pipe(duplex = False)
+            # not a daemon, so the solver can start its own worker pool (params "workers")
+            job.process = CONTEXT.Process(target = Run,
+                                           args = (job.variant, job.instance, job.params, sender, job.cancel))
+            job.process.start()
+            sender.close()
+            job.instance = None     # the worker has its copy
+            job.state = "running"
+            Send(job.writer, {"event": "started", "job": job.id})
+            done = loop.create_future()
+            loop.add_reader(receiver.fileno(), self.Receive, job, receiver, done)
+            try:
+                await done
+            finally:
+                loop.remove_reader(receiver.fileno())
+                receiver.close()
+                await loop.run_in_executor(None, job.process.join)
+                job.process.close()
+                job.process = None
+        finally:
+            self.slots.release()
+
+    def Receive(self, job, receiver, done):
+        """ reader callback: relays one event of the worker of job """
+        if done.done():
+            return
+        try:
+            kind, data = receiver.recv()
+        except EOFError:
+            # the worker ended without a result (killed, out of memory, ...)
+            self.Finish(job, "error", {"error": "worker exited without a result"})
+            done.set_result(None)
+            return
+        if kind == "improved":
+            job.best = data
+            Send(job.writer, dict(data, event = "improved", job = job.id))
+            return
+        self.Finish(job, kind, data)
+        done.set_result(None)
+
+    def Finish(self, job, kind, data):
+        """ records the outcome of job and sends its final event """
+        if kind == "error":
+            job.state = "error"
+        else:
+            job.state = "cancelled" if data["stop"] == "cancelled" else "done"
+            if data["cost"] is not None:
+                job.best = {"iteration": data["iterations"], "cost": data["cost"], "route": data["route"]}
+        job.instance = None
+        job.finished = time.monotonic()
+        Send(job.writer, dict(data, event = kind, job = job.id, state = job.state))
+        self.Evict()
+
+    def Evict(self):
+        """ forgets the finished jobs older than ttl seconds, then the oldest
+            finished ones beyond keep """
+        finished = sorted((job for job in self.jobs.values() if job.finished is not None),
+                          key = lambda job: job.finished)
+        now = time.monotonic()
+        for k, job in enumerate(finished):
+            if now - job.finished > self.ttl or len(finished) - k > self.keep:
+                del self.jobs[job.id]
+
+#------------------------------------CLIENT--------------------------------------------------------------
+
+async def Connect(host = "127.0.0.1", port = 8765, path = None):
+    """ (reader, writer) of a connection to the service """
+    if path is not None:
+        return await asyncio.open_unix_connection(path, limit = LINE)
+    return await asyncio.open_connection(host, port, limit = LINE)
+
+async def Request(writer, message):
+    Send(writer, message)
+    await writer.drain()
+
+async def Events(reader):
+    """ the messages of the service, as they arrive """
+    while True:
+        line = await reader.readline()
+        if not line:
+            return
+        yield json.loads(line)
+
+async def Solve(reader, writer, cost = None, file = None, variant = "MMAS", **params):
+    """ submits one solve and yields its events up to the final one. Use a
+        connection of its own, or read the events of other requests elsewhere """
+    request = {"op": "solve", "variant": variant, "params": params}
+    if file is not None:
+        request["file"] = file
+    else:
+        request["cost"] = np.asarray(cost).tolist()
+    await Request(writer, request)
+    async for event in Events(reader):
+        yield event
+        if event["event"] in ("done", "error"):
+            return
+
+#------------------------------------COMMAND LINE--------------------------------------------------------
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Anytime ACO solve service")
+    parser.add_argument("--host", default = "127.0.0.1")
+    parser.add_argument("--port", type = int, default = 8765)
+    parser.add_argument("--path", default = None, help = "listen on this unix socket instead")
+    parser.add_argument("--limit", type = int, default = None, help = "jobs running at once (default: cpus)")
+    parser.add_argument("--backlog", type = int, default = None, help = "jobs allowed to wait for a slot")
+    parser.add_argument("--keep", type = int, default = 1000, help = "finished jobs kept (default: 1000)")
+    parser.add_argument("--ttl", type = float, default = 3600, help = "seconds finished jobs are kept (default: 3600)")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(Service(args.limit, args.backlog, args.keep, args.ttl).Serve(args.host, args.port, args.path))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,35 @@
+# Compact route type: int32 nodes plus the cached tour cost, so routes are
+# costed once at construction and can be shared (not deep copied) by IBEST/BSF
+import numpy as np
+
+class Tour:
+    """ closed route (start node repeated at the end, as the list routes) stored
+        as an int32 array with its cost cached. Behaves like the list routes
+        for len, iteration, indexing and np.asarray. Tours are never changed
+        by the solvers, so IBEST and BSF hold the same object as the ant """
+    __slots__ = ("nodes", "cost")
+
+    def __init__(self, nodes, cost = None, costGraph = None):
+        self.nodes = np.asarray(nodes, dtype = np.int32)
+        if cost is None and costGraph is not None:
+            cost = costGraph[self.nodes[:-1], self.nodes[1:]].sum()
+        self.cost = None if cost is None else float(cost)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __iter__(self):
+        return iter(self.nodes.tolist())
+
+    def __getitem__(self, index):
+        return self.nodes[index]
+
+    def __array__(self, dtype = None, copy = None):
+        return self.nodes if dtype is None else self.nodes.astype(dtype)
+
+    def __repr__(self):
+        return "Tour(%s, cost = %r)" % (self.nodes.tolist(), self.cost)
+
+    def tolist(self):
+        return self.nodes.tolist()
+
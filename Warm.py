@@ -0,0 +1,95 @@
+# Warm start of the solvers from a previous run: its pheromone matrix (remapped when
+# cities were added or removed) and/or known good tours, which set the BSF and the
+# pheromone levels (the initial value, t0 of ACS, tmax/tmin of MMAS) instead of a random tour
+import numpy as np
+import Engine
+import Pheromone
+import Tours
+
+def Mapping(old, new):
+    """ takes the city labels (e.g. stop ids) of the previous and of the new instance
+        and returns for every new city its previous index, or -1 for added cities """
+    index = {label: i for i, label in enumerate(old)}
+    return np.array([index.get(label, -1) for label in new], dtype = np.int64)
+
+def Closed(route):
+    """ route with its start repeated at the end """
+    route = np.asarray(route, dtype = np.int64)
+    return route if len(route) > 1 and route[0] == route[-1] else np.append(route, route[:1])
+
+def RemapTour(route, mapping, cost):
+    """ takes a tour of the previous instance and returns it in the new indexing:
+        removed cities are dropped and added cities put in at their cheapest insertion """
+    route = Closed(route)[:-1]
+    kept = np.nonzero(mapping >= 0)[0]
+    inverse = np.full(max(int(mapping.max()), int(route.max())) + 1, -1, dtype = np.int64)
+    inverse[mapping[kept]] = kept
+    seq = [int(city) for city in inverse[route] if city >= 0]
+    for city in np.nonzero(mapping < 0)[0]:
+        if not seq:
+            seq.append(int(city))
+            continue
+        a = np.array(seq)
+        b = np.roll(a, -1)
+        delta = cost[a, city] + cost[city, b] - cost[a, b]
+        seq.insert(int(np.argmin(delta)) + 1, int(city))
+    return seq + seq[:1]
+
+def Start(warm, costGraph):
+    """ takes the warm start dict and the new costgraph. Keys (all optional):
+        "PRM": previous pheromone matrix, "mapping": previous index of every new city
+        (see Mapping; None when the cities did not change), "Route": previous best
+        tour in the previous indexing, "tours": known tours in the new indexing.
+        A previous solver result works as it is. Returns the mapping, the previous
+        PRM and the tours as {"Route", "Cost"} records sorted by cost """
+    cost = Engine.Costs(costGraph)
+    n = len(cost)
+    mapping = warm.get("mapping")
+    mapping = None if mapping is None else np.asarray(mapping, dtype = np.int64)
+    routes = list(warm.get("tours", []))
+    if warm.get("Route") is not None:
+        routes.append(warm["Route"] if mapping is None else RemapTour(warm["Route"], mapping, cost))
+    tours = []
+    for route in routes:
+        route = Closed(route)
+        if len(route) != n + 1 or not np.array_equal(np.sort(route[:-1]), np.arange(n)):
+            raise ValueError("warm start tours must visit every city of the new instance once")
+        tour = Tours.Tour(route, costGraph = cost)
+        tours.append({"Route": tour, "Cost": tour.cost})
+    tours.sort(key = lambda tour: tour["Cost"])
+    return {"mapping": mapping, "PRM": warm.get("PRM"), "tours": tours}
+
+def Best(warm, route, cost):
+    """ the best warm start tour and its cost, or route and cost when there is none """
+    if warm is None or not warm["tours"]:
+        return route, cost
+    return warm["tours"][0]["Route"], warm["tours"][0]["Cost"]
+
+def Remap(pheromoneGraph, previous, mapping = None, cand = None):
+    """ copies the previous pheromones into pheromoneGraph (in place): arcs between
+        cities of both instances take their previous value, arcs of added cities
+        keep the initial value. Works for every store; a packed one (either
+        side) goes through its n x n matrix """
+    previous = np.asarray(previous)
+    if mapping is None and previous.shape == pheromoneGraph.shape:
+        np.copyto(pheromoneGraph, previous)
+        return pheromoneGraph
+    if pheromoneGraph.ndim == 1:
+        pheromoneGraph[:] = Pheromone.Pack(Remap(Pheromone.Dense(pheromoneGraph), previous, mapping, cand))
+        return pheromoneGraph
+    previous = Pheromone.Dense(previous)
+    n = len(pheromoneGraph)
+    if mapping is None:
+        if previous.shape != (n, n):
+            raise ValueError("previous PRM of shape %s needs a mapping" % (previous.shape,))
+        mapping = np.arange(n)
+    if previous.shape[0] != previous.shape[1]:
+        raise ValueError("a candidate list PRM can only be reused for the same cities and candidates")
+    kept = mapping >= 0
+    if cand is None:
+        rows = np.nonzero(kept)[0]
+        pheromoneGraph[np.ix_(rows, rows)] = previous[np.ix_(mapping[rows], mapping[rows])]
+    else:
+        i, s = np.nonzero(kept[:, None] & kept[cand])
+        pheromoneGraph[i, s] = previous[mapping[i], mapping[cand[i, s]]]
+    return pheromoneGraph
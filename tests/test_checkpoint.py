@@ -0,0 +1,43 @@
+# Checkpoint / resume: a run split in two and resumed reproduces the uninterrupted run
+import os
+import sys
+import random
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import Pheromone
+from Islands import VARIANTS
+
+MODES = {"loop": {}, "batch": {"batch": True}, "candidates": {"candidates": 8}, "directed": {},
+         "workers": {"workers": 2}}
+
+def Instance(mode, n = 25):
+    rng = np.random.default_rng(3)
+    coords = rng.random((n, 2))
+    cost = np.sqrt(((coords[:, None] - coords[None])**2).sum(axis = -1))
+    if mode == "directed":
+        cost = cost*rng.uniform(1, 1.3, (n, n))
+    return cost
+
+def Solve(variant, cost, params, **more):
+    random.seed(5)
+    return VARIANTS[variant](cost, seed = 7, **dict(params, **more))
+
+@pytest.mark.parametrize("mode", sorted(MODES))
+@pytest.mark.parametrize("variant", sorted(VARIANTS))
+def test_resume(tmp_path, variant, mode):
+    if variant == "ACS" and mode == "workers":
+        pytest.skip("parallel ACS local updates race, so its runs are not reproducible")
+    cost, params = Instance(mode), MODES[mode]
+    full = Solve(variant, cost, params, iterations = 10)
+    first = Solve(variant, cost, params, iterations = 6, checkpoint = str(tmp_path))
+    if mode == "directed":
+        assert full["Layout"] == "directed"
+    for resume in (str(tmp_path), first["State"]):
+        random.seed(99)     # the checkpoint restores the global random state as well
+        rest = VARIANTS[variant](cost, iterations = 4, resume = resume, **params)
+        assert rest["Iterations"] == 10
+        assert rest["BSF"] == full["BSF"]
+        assert np.array_equal(np.asarray(rest["Route"]), np.asarray(full["Route"]))
+        assert np.array_equal(Pheromone.Dense(rest["PRM"]), Pheromone.Dense(full["PRM"]))
@@ -0,0 +1,27 @@
+# Kernel backends against the numpy path: same tours, pheromones and random streams
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import Kernels
+
+DTYPES = [np.float64, np.float32]
+
+@pytest.mark.parametrize("dtype", DTYPES)
+def test_python_backend(dtype):
+    assert Kernels.Check("python", dtype = dtype)
+
+@pytest.mark.parametrize("dtype", DTYPES)
+def test_numba_backend(dtype):
+    # numba promotes float32 with python floats to float64, numpy does not
+    pytest.importorskip("numba")
+    assert Kernels.Check("numba", dtype = dtype)
+
+def test_python_backend_after_numba():
+    # compiling the numba kernels must leave the python kernels uncompiled
+    pytest.importorskip("numba")
+    Kernels.Check("numba")
+    assert Kernels.KERNELS["python"]["Pick"].__globals__["Uniform"] is Kernels.KERNELS["python"]["Uniform"]
+    assert Kernels.Check("python")
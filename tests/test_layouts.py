@@ -0,0 +1,98 @@
+# Pheromone layouts: the packed store runs exactly like the full matrix, and the
+# directed one only ever writes the arcs in the direction they were travelled
+import os
+import sys
+import random
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import ACOAs
+import Engine
+import Kernels
+import Pheromone
+from Islands import VARIANTS
+
+MODES = {"loop": {}, "batch": {"batch": True}, "workers": {"workers": 2}}
+
+def Instance(n = 25):
+    rng = np.random.default_rng(3)
+    coords = rng.random((n, 2))
+    return np.sqrt(((coords[:, None] - coords[None])**2).sum(axis = -1))
+
+def Solve(variant, cost, **params):
+    random.seed(5)
+    return VARIANTS[variant](cost, iterations = 8, seed = 7, **params)
+
+@pytest.mark.parametrize("mode", sorted(MODES))
+@pytest.mark.parametrize("variant", sorted(VARIANTS))
+def test_packed_matches_full(variant, mode):
+    if variant == "ACS" and mode == "workers":
+        pytest.skip("parallel ACS local updates race, so its runs are not reproducible")
+    cost = Instance()
+    packed = Solve(variant, cost, layout = "packed", **MODES[mode])
+    full = Solve(variant, cost, layout = "full", **MODES[mode])
+    assert (packed["Layout"], full["Layout"]) == ("packed", "full")
+    assert packed["BSF"] == full["BSF"]
+    assert np.array_equal(np.asarray(packed["Route"]), np.asarray(full["Route"]))
+    # the full matrix keeps its initial value on the diagonal, the packed store has none
+    off = ~np.eye(len(cost), dtype = bool)
+    assert packed["PRM"].shape == full["PRM"].shape == cost.shape
+    assert np.array_equal(packed["PRM"][off], full["PRM"][off])
+
+@pytest.mark.parametrize("variant", sorted(VARIANTS))
+def test_directed_solver(variant):
+    cost = Instance()
+    full = Solve(variant, cost, layout = "full")
+    directed = Solve(variant, cost, layout = "directed")
+    assert directed["Layout"] == "directed"
+    assert np.array_equal(full["PRM"], full["PRM"].T)
+    assert not np.array_equal(directed["PRM"], directed["PRM"].T)
+
+def Forward(route, n):
+    """ mask of the arcs of route in its own direction """
+    mask = np.zeros((n, n), dtype = bool)
+    mask[route[:-1], route[1:]] = True
+    return mask
+
+UPDATES = {
+    "Deposit": lambda PRM, route: Pheromone.Deposit(PRM, route, 0.5, symmetric = False),
+    "Clamp": lambda PRM, route: Pheromone.Clamp(PRM, route, tmax = 0.5, symmetric = False),
+    "ACS": lambda PRM, route: ACOAs.ACSUpdatepheromone(route, Instance(), PRM, 0.1, symmetric = False),
+    "MMASdeposit": lambda PRM, route: ACOAs.MMASUpdatepheromone(route, Instance(), PRM, 1.5, symmetric = False),
+    "MMASevaporate": lambda PRM, route: ACOAs.MMASevaporate(route, PRM, 0.5, 0.2, symmetric = False),
+}
+
+@pytest.mark.parametrize("backend", ["numpy", "python"])
+@pytest.mark.parametrize("update", sorted(UPDATES))
+def test_directed_updates_forward_arcs(update, backend):
+    n = 25
+    order = np.random.default_rng(1).permutation(n)
+    route = np.append(order, order[0])
+    before = np.random.default_rng(2).uniform(0.8, 1.2, (n, n))
+    PRM = before.copy()
+    previous = Kernels.BACKEND
+    Kernels.Select(backend)
+    try:
+        UPDATES[update](PRM, route)
+    finally:
+        Kernels.Select(previous)
+    assert np.array_equal(PRM != before, Forward(route, n))
+
+@pytest.mark.parametrize("backend", ["numpy", "python"])
+def test_directed_local_update(backend):
+    n = 25
+    cost = Instance(n)
+    etaB = Engine.Heuristic(cost)**3
+    before = np.random.default_rng(2).uniform(0.8, 1.2, (n, n))
+    PRM = before.copy()
+    choice, greedy = Engine.ChoiceMatrix(PRM, etaB, 1, 1), PRM*etaB
+    previous = Kernels.BACKEND
+    Kernels.Select(backend)
+    try:
+        route = Engine.ArrayACSTravel(choice, greedy, PRM, etaB, 0.01, rng = np.random.default_rng(4),
+                                      symmetric = False)
+    finally:
+        Kernels.Select(previous)
+    # the local update runs on the way, not on the arc closing the tour
+    assert np.array_equal(PRM != before, Forward(route[:-1], n))
@@ -0,0 +1,54 @@
+# 2-opt / Or-opt: the result is a tour of every city and never costs more than its input
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import Engine
+import LocalSearch
+
+def Instance(rng, n, symmetric):
+    coords = rng.random((n, 2))
+    cost = np.sqrt(((coords[:, None] - coords[None])**2).sum(axis = -1))
+    if not symmetric:
+        cost = cost*rng.uniform(1, 1.5, (n, n))
+        np.fill_diagonal(cost, 0)
+    return cost
+
+def Routes(rng, n, ants):
+    routes = np.array([rng.permutation(n) for ant in range(ants)])
+    return np.concatenate((routes, routes[:, :1]), axis = 1)
+
+def Valid(route, n):
+    route = np.asarray(route)
+    return len(route) == n + 1 and route[0] == route[-1] and np.array_equal(np.sort(route[:-1]), np.arange(n))
+
+@pytest.mark.parametrize("symmetric", [True, False])
+@pytest.mark.parametrize("mode", LocalSearch.MODES)
+def test_apply(symmetric, mode):
+    rng = np.random.default_rng(0)
+    for trial in range(25):
+        n = int(rng.integers(5, 40))
+        cost = Instance(rng, n, symmetric)
+        near = Engine.Candidates(cost, min(10, n - 1))
+        routes = Routes(rng, n, 4)
+        costs = Engine.TourCosts(cost, routes)
+        search = LocalSearch.Symmetrized(cost, symmetric)
+        improved, improvedCosts = LocalSearch.Apply(routes.copy(), costs.copy(), cost, near, mode, costs.max() + 1,
+                                                    symmetric = symmetric, search = search)
+        assert all(Valid(route, n) for route in improved)
+        assert np.allclose(improvedCosts, Engine.TourCosts(cost, improved))
+        assert np.all(improvedCosts <= costs + 1e-9)
+
+@pytest.mark.parametrize("moves", [("2opt",), ("oropt",), ("2opt", "oropt")])
+def test_improve(moves):
+    rng = np.random.default_rng(1)
+    for trial in range(25):
+        n = int(rng.integers(3, 40))
+        cost = Instance(rng, n, True)
+        near = Engine.Candidates(cost, min(10, n - 1))
+        route = Routes(rng, n, 1)[0]
+        improved = LocalSearch.Improve(route, cost, near, moves)
+        assert Valid(improved, n)
+        assert Engine.TourCosts(cost, improved[None])[0] <= Engine.TourCosts(cost, route[None])[0] + 1e-9
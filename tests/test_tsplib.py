@@ -0,0 +1,77 @@
+# TSPLIB reading: the EDGE_WEIGHT_TYPE rounding rules and the EXPLICIT formats
+import os
+import sys
+import math
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import RouteMatrix
+
+def Instance(tmp_path, kind, body, n, name = "t.tsp", extra = ""):
+    path = tmp_path / name
+    path.write_text("NAME : t\nTYPE : TSP\nDIMENSION : %d\nEDGE_WEIGHT_TYPE : %s\n%s%s\nEOF\n" % (n, kind, extra, body))
+    return str(path)
+
+def Coords(points):
+    return "NODE_COORD_SECTION\n" + "\n".join("%d %s %s" % (k + 1, x, y) for k, (x, y) in enumerate(points))
+
+# (points, expected matrix) worked out by hand from the TSPLIB definitions
+METRICS = {
+    # nint(sqrt(dx^2 + dy^2)): 5, nint(2.236) = 2, nint(2.828) = 3
+    "EUC_2D": ([(0, 0), (3, 4), (1, 2)], [[0, 5, 2], [5, 0, 3], [2, 3, 0]]),
+    # ceil(sqrt(dx^2 + dy^2)): 5, ceil(2.236) = 3, ceil(2.828) = 3
+    "CEIL_2D": ([(0, 0), (3, 4), (1, 2)], [[0, 5, 3], [5, 0, 3], [3, 3, 0]]),
+    # r = sqrt((dx^2 + dy^2)/10), t = nint(r), t + 1 when t < r: r = 3.162 -> 4, 9.487 -> 10, 10 -> 10
+    "ATT": ([(0, 0), (10, 0), (0, 30)], [[0, 4, 10], [4, 0, 10], [10, 10, 0]]),
+}
+
+@pytest.mark.parametrize("kind", sorted(METRICS))
+def test_rounding(tmp_path, kind):
+    points, expected = METRICS[kind]
+    cost = RouteMatrix.TSRM(Instance(tmp_path, kind, Coords(points), len(points)))
+    assert np.array_equal(cost, np.array(expected, dtype = float))
+
+def Geo(x):
+    """ the TSPLIB reference conversion of DDD.MM to radians """
+    degrees = int(x)
+    return 3.141592*(degrees + 5.0*(x - degrees)/3.0)/180.0
+
+def test_geo(tmp_path):
+    points = [(38.24, 20.42), (39.57, 26.15), (-40.56, -24.11), (36.26, 23.12)]
+    expected = np.zeros((4, 4))
+    for i, (xi, yi) in enumerate(points):
+        for j, (xj, yj) in enumerate(points):
+            if i != j:
+                q1 = math.cos(Geo(yi) - Geo(yj))
+                q2 = math.cos(Geo(xi) - Geo(xj))
+                q3 = math.cos(Geo(xi) + Geo(xj))
+                expected[i, j] = int(6378.388*math.acos(0.5*((1.0 + q1)*q2 - (1.0 - q1)*q3)) + 1.0)
+    cost = RouteMatrix.TSRM(Instance(tmp_path, "GEO", Coords(points), len(points)))
+    assert np.array_equal(cost, expected)
+
+MATRIX = np.array([[0, 1, 2, 3], [1, 0, 4, 5], [2, 4, 0, 6], [3, 5, 6, 0]], dtype = float)
+FORMATS = {
+    "FULL_MATRIX": "0 1 2 3 1 0 4 5 2 4 0 6 3 5 6 0",
+    "UPPER_ROW": "1 2 3 4 5 6",
+    "LOWER_ROW": "1 2 4 3 5 6",
+    "UPPER_DIAG_ROW": "0 1 2 3 0 4 5 0 6 0",
+    "LOWER_DIAG_ROW": "0 1 0 2 4 0 3 5 6 0",
+    "UPPER_COL": "1 2 4 3 5 6",
+    "LOWER_COL": "1 2 3 4 5 6",
+    "UPPER_DIAG_COL": "0 1 0 2 4 0 3 5 6 0",
+    "LOWER_DIAG_COL": "0 1 2 3 0 4 5 0 6 0",
+}
+
+@pytest.mark.parametrize("fmt", sorted(FORMATS))
+def test_explicit(tmp_path, fmt):
+    # weights spread over lines of any length, then a section that must be skipped
+    words = FORMATS[fmt].split()
+    body = "EDGE_WEIGHT_SECTION\n" + "\n".join(" ".join(words[k:k+3]) for k in range(0, len(words), 3))
+    body += "\nDISPLAY_DATA_SECTION\n1 0 0\n2 1 0\n3 0 1\n4 1 1"
+    path = Instance(tmp_path, "EXPLICIT", body, 4, extra = "EDGE_WEIGHT_FORMAT : %s\n" % fmt)
+    assert np.array_equal(RouteMatrix.TSRM(path), MATRIX)
+
+def test_explicit_unknown_format():
+    with pytest.raises(ValueError):
+        RouteMatrix.Explicit(np.arange(6.0), 4, "FUNCTION")